@@ -0,0 +1,53 @@
+"""
+Measures the import time of the pysolvation modules in fresh interpreters
+and which heavy dependencies each import pulls in
+prints one json record per module
+usage (from the repository root): python -m benchmarks.bench_imports [--repeat 5] [module ...]
+"""
+import sys
+import json
+import argparse
+import subprocess
+
+modules = ["pysolvation.cosmo.tabparser",
+           "pysolvation.cosmo.cosmotherm",
+           "pysolvation.cosmo.cache",
+           "pysolvation.cosmo.database",
+           "pysolvation.database",
+           "pysolvation.solvation.solute",
+           "pysolvation.solvation.solvent",
+           "pysolvation.solvation.fitting",
+           "pysolvation.solvation.prediction",
+           "pysolvation.turbomole.turbomole"]
+
+heavy_dependencies = ["numpy","pandas","scipy","sklearn","rdkit"]
+
+script = """
+import sys, time, json
+t = time.perf_counter()
+import {module}
+t = time.perf_counter()-t
+print(json.dumps({{"time":t,"loaded":[m for m in {heavy} if m in sys.modules]}}))
+"""
+
+def bench_imports(modules,repeat=5):
+    for module in modules:
+        times = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable,"-c",script.format(module=module,heavy=heavy_dependencies)],
+                                 capture_output=True,text=True,check=True).stdout
+            result = json.loads(out.splitlines()[-1])
+            times.append(result["time"])
+        yield {"benchmark":"imports","module":module,"time":min(times),
+               "heavy_dependencies":result["loaded"]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat",type=int,default=5)
+    parser.add_argument("modules",nargs="*",default=modules)
+    args = parser.parse_args(argv)
+    for record in bench_imports(args.modules,args.repeat):
+        print(json.dumps(record))
+
+if __name__ == "__main__":
+    main()
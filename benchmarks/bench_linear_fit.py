@@ -0,0 +1,49 @@
+"""
+Compares linear_fit against the previous Linear Regression + Least Squares
++ Dual Annealing pipeline on synthetic Abraham fitting problems
+prints one json record per dataset size
+usage (from the repository root): python -m benchmarks.bench_linear_fit [n1 n2 ...]
+"""
+import sys
+import json
+import time
+import numpy as np
+from scipy.optimize import least_squares, dual_annealing
+from pysolvation.solvation.fitting import linear_fit, loss_function, solvent_parameter_bounds
+
+def legacy_linear_fit(A,b):
+    x0 = np.linalg.lstsq(A,b,rcond=None)[0]
+    lsparam = least_squares(loss_function,x0,args=(A,b)).x
+    daparam = dual_annealing(loss_function,solvent_parameter_bounds,args=(A,b)).x
+    xs = [x0,lsparam,daparam]
+    vals = [loss_function(x,A,b) for x in xs]
+    return min(vals)
+
+def make_problem(n,seed=0):
+    rng = np.random.default_rng(seed)
+    A = np.column_stack([rng.uniform(0,2,(n,5)),np.ones(n)])
+    x = np.array([0.3,1.2,3.5,4.8,0.9,-0.4])
+    b = np.dot(A,x)+rng.laplace(0,0.3,n)
+    return A,b
+
+def main(sizes):
+    #warm up so the lazy sklearn and scipy imports of linear_fit aren't timed
+    A,b = make_problem(20)
+    linear_fit(A,b)
+    legacy_linear_fit(A,b)
+    for n in sizes:
+        A,b = make_problem(n)
+        t = time.perf_counter()
+        legacy_loss = legacy_linear_fit(A,b)
+        legacy_time = time.perf_counter()-t
+        t = time.perf_counter()
+        _,loss,method = linear_fit(A,b)
+        new_time = time.perf_counter()-t
+        print(json.dumps({"benchmark":"linear_fit","n":n,
+                          "legacy_time":legacy_time,"legacy_loss":float(legacy_loss),
+                          "time":new_time,"loss":float(loss),"method":method,
+                          "speedup":legacy_time/new_time}))
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [100,1000,10000]
+    main(sizes)
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the Turbomole calculate script used by the benchmarks
+writes Cosmofiles<level>/<name>.cosmo and Energyfiles<level>/<name>.energy
+for the molecule listed in the -l file after sleeping
+FAKE_TURBOMOLE_LATENCY seconds (default 0)
+usage: fake_calculate.py -l name.txt -m level -f xyz -din xyz
+"""
+import os
+import sys
+import time
+
+def main(args):
+    listfile = args[args.index("-l")+1]
+    level = args[args.index("-m")+1]
+    with open(listfile) as f:
+        name = f.read().split()[0]
+    time.sleep(float(os.environ.get("FAKE_TURBOMOLE_LATENCY","0")))
+    for kind,ext in [("Cosmofiles",".cosmo"),("Energyfiles",".energy")]:
+        d = kind+level
+        os.makedirs(d,exist_ok=True)
+        with open(os.path.join(d,name+ext),'w') as f:
+            f.write("$fake {} {}\n".format(name,level))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
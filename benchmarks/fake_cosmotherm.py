@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the COSMOtherm executable used by the benchmarks
+reads a .inp file written by COSMOJob.generate_input_file and writes the
+.tab, .out and _status.xml files COSMOtherm would, with deterministic
+made up values, after sleeping FAKE_COSMOTHERM_LATENCY seconds (default 0)
+usage: fake_cosmotherm.py job.inp
+"""
+import os
+import re
+import sys
+import time
+import zlib
+
+def fake_gsolv(name,T):
+    """
+    deterministic made up Gsolv in kcal/mol for a compound at T
+    """
+    return -2.0-(zlib.crc32(name.encode()) % 1000)/200.0+0.01*(T-298.15)
+
+def write_tab(path,names,Tlist,flashpoint=False):
+    """
+    writes a .tab file in COSMOtherm's format with a henry block
+    for each temperature and optionally a flashpoint block
+    """
+    with open(path,'w') as f:
+        job = 0
+        for T in Tlist:
+            job += 1
+            f.write("Settings  job {:>3} : T= {:.2f} K ;\n".format(job,T))
+            f.write("Units     job {:>3} : Energies in kcal/mol ; Pressures in bar ;\n".format(job))
+            f.write("Property  job {:>3} : Henry law coefficients H ;\n".format(job))
+            f.write("  Nr Compound                 H            ln(gamma)        pv          Gsolv\n")
+            for i,name in enumerate(names):
+                Gsolv = fake_gsolv(name,T)
+                f.write("{:>4} {:<20} {:>14.6E} {:>12.5f} {:>14.6E} {:>12.5f}\n".format(
+                    i+1,name,1.0e-3*(i+1),0.1*(i % 7),1.0e-2*(i+1),Gsolv))
+            f.write("\n")
+        if flashpoint:
+            job += 1
+            f.write("Property  job {:>3} : Flash point temperature ;\n".format(job))
+            f.write("   Tflash      PVsat\n")
+            f.write("   312.450     15.2000\n")
+
+def main(inp):
+    base = inp[:-4]
+    with open(inp) as f:
+        lines = f.read().splitlines()
+    names = []
+    Tlist = []
+    flashpoint = False
+    for line in lines:
+        m = re.match(r'f = "(.*)_c0\.cosmo"',line)
+        if m:
+            names.append(m.group(1))
+        m = re.search(r'tk=(\S+)',line)
+        if line.startswith("henry") and m:
+            Tlist.append(float(m.group(1)))
+        if line.startswith("flashpoint"):
+            flashpoint = True
+    time.sleep(float(os.environ.get("FAKE_COSMOTHERM_LATENCY","0")))
+    write_tab(base+".tab",names,Tlist,flashpoint)
+    with open(base+".out",'w') as f:
+        f.write("COSMOtherm stand-in\n")
+    with open(base+"_status.xml",'w') as f:
+        f.write("<status>finished</status>\n")
+
+if __name__ == "__main__":
+    main(sys.argv[1])
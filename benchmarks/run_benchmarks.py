@@ -0,0 +1,258 @@
+"""
+Benchmark suite for pysolvation
+runs each benchmark case at several sizes and writes one json record per
+case to stdout or to --output, the first record holds run metadata so
+results from different versions can be compared
+COSMOtherm and Turbomole are replaced by the fake_cosmotherm.py and
+fake_calculate.py stand-ins, --latency sets their per job sleep in seconds
+usage (from the repository root):
+python -m benchmarks.run_benchmarks [--sizes 100 1000] [--only name ...] [--output results.jsonl]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+from rdkit import RDLogger
+
+from pysolvation.database import InchiKeyedDatabase, smiles_to_inchi
+from pysolvation.identifiers import IdentifierCache, resolve_smiles
+from pysolvation.solvation.solute import load_solutes, load_solute_store, save_solute_store
+from pysolvation.cosmo.database import (COSMOSpecies, COSMODatabase, database_summary_to_species,
+                                        save_cosmo_database, load_cosmo_database)
+from pysolvation.cosmo.cosmotherm import COSMOJob, calculate_dG_dH_solutes
+from pysolvation.cosmo.scheduler import COSMOJobScheduler
+from pysolvation.solvation.fitting import linear_fit, fit_solvent_parameters
+from pysolvation.turbomole.turbomole import TurbomoleJob
+from pysolvation.turbomole.pipeline import ConformerPipeline
+from benchmarks.fake_cosmotherm import write_tab
+from benchmarks.bench_imports import bench_imports, modules
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+
+def timeit(func,repeat=3):
+    """
+    returns the best wall time in seconds of repeat calls of func
+    """
+    best = np.inf
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        best = min(best,time.perf_counter()-t)
+    return best
+
+def make_smiles(n,seed=0):
+    """
+    returns n distinct acyclic SMILES with their FixedH InChIs
+    """
+    rng = np.random.default_rng(seed)
+    smiles = []
+    inchis = []
+    seen = set()
+    atoms = ["C","C","C","N","O"]
+    while len(smiles) < n:
+        smi = "C"+"".join(rng.choice(atoms,size=rng.integers(2,14)))
+        inchi = smiles_to_inchi(smi)
+        if inchi is None or inchi in seen:
+            continue
+        seen.add(inchi)
+        smiles.append(smi)
+        inchis.append(inchi)
+    return smiles,inchis
+
+def write_solute_csv(path,n):
+    smiles,inchis = make_smiles(n)
+    params = np.random.default_rng(1).uniform(0,2,(n,5))
+    df = pd.DataFrame({"smiles":smiles,"inchi":inchis})
+    for i,name in enumerate(["E","S","A","B","L"]):
+        df[name] = params[:,i]
+    df.to_csv(path,index=False)
+    return df
+
+def write_cosmo_csv(path,n,cosmo_dir):
+    smiles,inchis = make_smiles(n)
+    df = pd.DataFrame({"cosmo name":["spc{}".format(i) for i in range(n)],
+                       "inchi":inchis,"smiles":smiles,
+                       "number of conformers":np.ones(n,dtype=int),
+                       "file path":[cosmo_dir]*n})
+    df.to_csv(path,index=False)
+    return df
+
+def bench_database(sizes,workdir,max_workers):
+    for n in sizes:
+        path = os.path.join(workdir,"solutes{}.csv".format(n))
+        df = write_solute_csv(path,n)
+        spcs = load_solutes(path)
+        build = timeit(lambda: InchiKeyedDatabase(spcs),repeat=1)
+        db = InchiKeyedDatabase(spcs)
+        inchis = list(df["inchi"])
+        smiles = list(df["smiles"])
+        lookup_inchi = timeit(lambda: [db.get_species_inchi(inchi) for inchi in inchis])
+        lookup_smiles = timeit(lambda: [db.get_species_smiles(smi) for smi in smiles])
+        cache = IdentifierCache(os.path.join(workdir,"identifiers{}.sqlite".format(n)))
+        resolve_serial = timeit(lambda: resolve_smiles(smiles),repeat=1)
+        resolve_parallel = timeit(lambda: resolve_smiles(smiles,max_workers=max_workers,cache=cache),repeat=1)
+        resolve_cached = timeit(lambda: resolve_smiles(smiles,cache=cache))
+        cache.close()
+        yield {"benchmark":"database","n":n,"build":build,
+               "lookup_inchi_per_call":lookup_inchi/n,"lookup_smiles_per_call":lookup_smiles/n,
+               "resolve_serial":resolve_serial,"resolve_parallel":resolve_parallel,"resolve_cached":resolve_cached}
+
+def bench_loading(sizes,workdir):
+    for n in sizes:
+        path = os.path.join(workdir,"solutes{}.csv".format(n))
+        if not os.path.exists(path):
+            write_solute_csv(path,n)
+        cosmo_path = os.path.join(workdir,"cosmo{}.csv".format(n))
+        write_cosmo_csv(cosmo_path,n,workdir)
+        binary_path = os.path.join(workdir,"solutes{}.bin".format(n))
+        save_solute_store(load_solute_store(path),binary_path)
+        cosmo_binary_path = os.path.join(workdir,"cosmo{}.bin".format(n))
+        save_cosmo_database(database_summary_to_species(cosmo_path),cosmo_binary_path)
+        yield {"benchmark":"loading","n":n,
+               "load_solutes":timeit(lambda: load_solutes(path)),
+               "load_solute_store":timeit(lambda: load_solute_store(path)),
+               "load_solute_store_binary":timeit(lambda: load_solute_store(binary_path)),
+               "database_summary_to_species":timeit(lambda: database_summary_to_species(cosmo_path)),
+               "load_cosmo_database_binary":timeit(lambda: load_cosmo_database(cosmo_binary_path))}
+
+def bench_fitting(sizes,workdir):
+    rng = np.random.default_rng(2)
+    for n in sizes:
+        A = np.column_stack([rng.uniform(0,2,(n,5)),np.ones(n)])
+        b = np.dot(A,[0.3,1.2,3.5,4.8,0.9,-0.4])+rng.laplace(0,0.3,n)
+        linear = timeit(lambda: linear_fit(A,b),repeat=2)
+        path = os.path.join(workdir,"solutes{}.csv".format(n))
+        if not os.path.exists(path):
+            write_solute_csv(path,n)
+        store = load_solute_store(path)
+        dG = -np.dot(store.data,[0.3,1.2,3.5,4.8,0.9,-0.4])*np.log(10)*8.314*298.15
+        dH = np.dot(store.data,[-1.0,-2.0,-30.0,-5.0,-9.0,-6.0])*1000.0
+        dGsolv_dict = dict(zip(store.inchi,dG))
+        dHsolv_dict = dict(zip(store.inchi,dH))
+        fit = timeit(lambda: fit_solvent_parameters(store,dGsolv_dict,dHsolv_dict),repeat=1)
+        yield {"benchmark":"fitting","n":n,"linear_fit":linear,"fit_solvent_parameters":fit}
+
+def bench_cosmo_io(sizes,workdir):
+    for n in sizes:
+        spcs = [COSMOSpecies("spc{}".format(i),"inchi{}".format(i),"C",1,workdir) for i in range(n)]
+        mole_fractions = {spc:0.0 for spc in spcs}
+        mole_fractions[spcs[0]] = 1.0
+        Tlist = [298.15+10.0*i for i in range(10)]
+        job = COSMOJob(spcs,mole_fractions=mole_fractions,Tlist=Tlist,path=os.path.join(workdir,"io{}".format(n)))
+        generate = timeit(job.generate_input_file)
+
+        def parse():
+            write_tab(job.path+".tab",[spc.name for spc in spcs],Tlist)
+            for ext in [".out","_status.xml"]:
+                open(job.path+ext,'w').close()
+            job.generate_input_file()
+            job.reset_outputs()
+            t = time.perf_counter()
+            job.process_output()
+            return time.perf_counter()-t
+        process = min(parse() for _ in range(3))
+        yield {"benchmark":"cosmo_io","n_species":n,"n_T":len(Tlist),
+               "generate_input_file":generate,"process_output":process}
+
+def bench_end_to_end(sizes,workdir,latency,max_workers,batch_size):
+    solvent = COSMOSpecies("water","InChI=1/H2O/h1H2","O",1,workdir)
+    for n in sizes:
+        solutes = [COSMOSpecies("spc{}".format(i),"inchi{}".format(i),"C",1,workdir) for i in range(n)]
+        db = COSMODatabase(solutes,"TZVPD-FINE")
+        scheduler = COSMOJobScheduler(max_workers=max_workers,scratch_dir=os.path.join(workdir,"scratch"))
+        t = time.perf_counter()
+        dGsolv_dict,_ = calculate_dG_dH_solutes({solvent:1.0},db,scheduler=scheduler,batch_size=batch_size)
+        elapsed = time.perf_counter()-t
+        yield {"benchmark":"end_to_end","n":n,"latency":latency,"max_workers":max_workers,
+               "batch_size":batch_size,"time":elapsed,"solutes_per_s":n/elapsed,
+               "completed":len(dGsolv_dict),"failures":len(scheduler.failures)}
+
+def bench_turbomole(sizes,workdir,latency,max_workers):
+    cwd = os.getcwd()
+    jobdir = os.path.join(workdir,"turbomole")
+    os.makedirs(jobdir,exist_ok=True)
+    os.chdir(jobdir)
+    try:
+        for n in sizes:
+            n = min(n,100)
+            t = time.perf_counter()
+            for i in range(n):
+                job = TurbomoleJob("mol{}".format(i),"O 0.0 0.0 0.0\nH 0.0 0.0 1.0\nH 0.0 1.0 0.0",0,1)
+                job.run()
+            elapsed = time.perf_counter()-t
+            pipeline = ConformerPipeline(os.path.join(jobdir,"pipeline{}".format(n)),ncores=max_workers)
+            pipeline.add_species("mol","InChI=1S/H2O/h1H2","O",["O 0.0 0.0 0.0\nH 0.0 0.0 1.0\nH 0.0 1.0 0.0"]*n)
+            t = time.perf_counter()
+            pipeline.run()
+            pipeline_elapsed = time.perf_counter()-t
+            yield {"benchmark":"turbomole","n":n,"latency":latency,"max_workers":max_workers,
+                   "time":elapsed,"jobs_per_s":n/elapsed,
+                   "pipeline_time":pipeline_elapsed,"pipeline_jobs_per_s":n/pipeline_elapsed}
+    finally:
+        os.chdir(cwd)
+
+def metadata():
+    try:
+        rev = subprocess.run(["git","rev-parse","HEAD"],cwd=bench_dir,capture_output=True,
+                             text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    return {"benchmark":"metadata","time":time.time(),"git_rev":rev,
+            "python":platform.python_version(),"platform":platform.platform(),
+            "numpy":np.__version__,"pandas":pd.__version__}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes",type=int,nargs="+",default=[100,1000,10000])
+    parser.add_argument("--only",nargs="+",default=None,
+                        choices=["imports","database","loading","fitting","cosmo_io","end_to_end","turbomole"])
+    parser.add_argument("--latency",type=float,default=0.0)
+    parser.add_argument("--max-workers",type=int,default=4)
+    parser.add_argument("--batch-size",type=int,default=1)
+    parser.add_argument("--output",default=None)
+    args = parser.parse_args(argv)
+
+    RDLogger.DisableLog("rdApp.*")
+    workdir = tempfile.mkdtemp(prefix="pysolvation_bench_")
+    bindir = os.path.join(workdir,"bin")
+    os.makedirs(bindir)
+    os.symlink(os.path.join(bench_dir,"fake_calculate.py"),os.path.join(bindir,"calculate"))
+    os.environ["PATH"] = bindir+os.pathsep+os.environ.get("PATH","")
+    os.environ["COSMOTHERM"] = os.path.join(bench_dir,"fake_cosmotherm.py")
+    os.environ["COSMOTHERMPATH"] = workdir
+    os.environ["FAKE_COSMOTHERM_LATENCY"] = str(args.latency)
+    os.environ["FAKE_TURBOMOLE_LATENCY"] = str(args.latency)
+
+    e2e_sizes = [min(n,1000) for n in args.sizes]
+    cases = {"imports":lambda: bench_imports(modules),
+             "database":lambda: bench_database(args.sizes,workdir,args.max_workers),
+             "loading":lambda: bench_loading(args.sizes,workdir),
+             "fitting":lambda: bench_fitting(args.sizes,workdir),
+             "cosmo_io":lambda: bench_cosmo_io(args.sizes,workdir),
+             "end_to_end":lambda: bench_end_to_end(e2e_sizes,workdir,args.latency,
+                                                   args.max_workers,args.batch_size),
+             "turbomole":lambda: bench_turbomole(args.sizes,workdir,args.latency,args.max_workers)}
+
+    out = open(args.output,'w') if args.output else sys.stdout
+    try:
+        out.write(json.dumps(metadata())+"\n")
+        for name,case in cases.items():
+            if args.only and name not in args.only:
+                continue
+            for record in case():
+                out.write(json.dumps(record)+"\n")
+                out.flush()
+    finally:
+        if args.output:
+            out.close()
+        shutil.rmtree(workdir,ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
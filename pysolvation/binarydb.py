@@ -0,0 +1,278 @@
+"""
+Compact columnar binary format for species databases
+
+layout: the magic bytes, the length of a json header, the json header and then
+one 64 byte aligned block per array, string columns are stored as an offsets
+array and a utf-8 data array, identifier indexes as sorted 64 bit hashes of the
+identifiers and the rows they belong to
+files are memory mapped copy-on-write so every process on a node opening the
+same file shares one physical copy of it and opening only reads the header
+"""
+import os
+import mmap
+import json
+import struct
+import hashlib
+import numpy as np
+from pysolvation.database import InchiKeyedDatabase, smiles_to_inchi
+
+magic = b"PYSOLVDB"
+version = 1
+alignment = 64
+
+def identifier_hash(identifier):
+    """
+    stable (unlike hash()) 64 bit hash of an identifier string
+    """
+    return int.from_bytes(hashlib.blake2b(identifier.encode(),digest_size=8).digest(),"little")
+
+def is_binary_database(path):
+    """
+    checks whether the file at path is a binary database rather than a csv
+    """
+    with open(path,'rb') as f:
+        return f.read(len(magic)) == magic
+
+def _padding(n):
+    return -n % alignment
+
+def write_database(path,kind,length,strings=None,arrays=None,indexed=(),meta=None):
+    """
+    Writes a binary database of length rows to path
+    strings maps column names to sequences of strings (None or non-strings for missing values),
+    arrays maps names to arrays whose first dimension is length, identifier indexes
+    are built on the string columns named in indexed and meta is any json serializable
+    metadata, kind names what the rows are so readers can check they got the right file
+    the file is written next to path and moved into place so processes that already
+    have the old file open keep a consistent copy
+    """
+    strings = strings or dict()
+    arrays = arrays or dict()
+    blocks = dict()
+    for name,values in strings.items():
+        values = list(values)
+        if len(values) != length:
+            raise ValueError("Column {} has {} values, expected {}".format(name,len(values),length))
+        encoded = [v.encode() if isinstance(v,str) else b"" for v in values]
+        offsets = np.zeros(length+1,dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        blocks[name+".offsets"] = offsets
+        blocks[name+".data"] = np.frombuffer(b"".join(encoded),dtype=np.uint8)
+        blocks[name+".valid"] = np.array([isinstance(v,str) for v in values],dtype=bool)
+        if name in indexed:
+            rows = np.flatnonzero(blocks[name+".valid"])
+            hashes = np.array([identifier_hash(values[i]) for i in rows],dtype=np.uint64)
+            order = np.argsort(hashes,kind="stable")
+            blocks[name+".hash"] = hashes[order]
+            blocks[name+".rows"] = rows[order].astype(np.int64)
+    for name,array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype == object or len(array) != length:
+            raise ValueError("Array {} must be numeric with first dimension {}".format(name,length))
+        blocks[name] = array
+
+    offset = 0
+    layout = dict()
+    for name,array in blocks.items():
+        offset += _padding(offset)
+        layout[name] = {"dtype":array.dtype.str,"shape":list(array.shape),"offset":offset}
+        offset += array.nbytes
+    header = json.dumps({"version":version,"kind":kind,"length":length,"meta":meta or dict(),
+                         "strings":list(strings),"indexes":list(indexed),"arrays":list(arrays),
+                         "blocks":layout}).encode()
+    start = len(magic)+8+len(header)
+    header += b" "*_padding(start)
+
+    tmp = path+".tmp{}".format(os.getpid())
+    with open(tmp,'wb') as f:
+        f.write(magic)
+        f.write(struct.pack("<Q",len(header)))
+        f.write(header)
+        written = 0
+        for name,array in blocks.items():
+            f.write(b"\0"*(layout[name]["offset"]-written))
+            f.write(array.tobytes())
+            written = layout[name]["offset"]+array.nbytes
+    os.replace(tmp,path)
+
+class StringColumn:
+    """
+    Read-only sequence of strings decoded on access from a memory mapped column
+    missing values are returned as None
+    """
+    def __init__(self,offsets,data,valid):
+        self.offsets = offsets
+        self.data = data
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.valid)
+
+    def __getitem__(self,index):
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("StringColumn index out of range")
+        if not self.valid[index]:
+            return None
+        return self.data[self.offsets[index]:self.offsets[index+1]].tobytes().decode()
+
+    def __iter__(self):
+        data = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        for i,valid in enumerate(self.valid.tolist()):
+            yield data[offsets[i]:offsets[i+1]].decode() if valid else None
+
+class IdentifierIndex:
+    """
+    Read-only mapping from identifiers to the first row holding them
+    backed by the prebuilt hash index of a string column
+    """
+    def __init__(self,column,hashes,rows):
+        self.column = column
+        self.hashes = hashes
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self,identifier,default=None):
+        if not isinstance(identifier,str):
+            return default
+        h = np.uint64(identifier_hash(identifier))
+        j = int(np.searchsorted(self.hashes,h))
+        while j < len(self.hashes) and self.hashes[j] == h:
+            row = int(self.rows[j])
+            if self.column[row] == identifier:
+                return row
+            j += 1
+        return default
+
+    def __getitem__(self,identifier):
+        row = self.get(identifier)
+        if row is None:
+            raise KeyError(identifier)
+        return row
+
+    def __contains__(self,identifier):
+        return self.get(identifier) is not None
+
+class BinaryDatabase:
+    """
+    Memory mapped binary database written by write_database
+    if kind is given a ValueError is raised when the file holds something else
+    """
+    def __init__(self,path,kind=None):
+        self.path = path
+        with open(path,'rb') as f:
+            if f.read(len(magic)) != magic:
+                raise ValueError("{} is not a binary database".format(path))
+            self.mmap = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_COPY)
+        n = struct.unpack_from("<Q",self.mmap,len(magic))[0]
+        start = len(magic)+8
+        header = json.loads(self.mmap[start:start+n].decode())
+        if header["version"] > version:
+            raise ValueError("{} has unsupported version {}".format(path,header["version"]))
+        if kind is not None and header["kind"] != kind:
+            raise ValueError("{} holds a {} database, expected {}".format(path,header["kind"],kind))
+        self.kind = header["kind"]
+        self.length = header["length"]
+        self.meta = header["meta"]
+        self.string_names = header["strings"]
+        self.index_names = header["indexes"]
+        self.array_names = header["arrays"]
+        self.blocks = dict()
+        for name,block in header["blocks"].items():
+            dtype = np.dtype(block["dtype"])
+            self.blocks[name] = np.frombuffer(self.mmap,dtype=dtype,count=int(np.prod(block["shape"])),
+                                              offset=start+n+block["offset"]).reshape(block["shape"])
+
+    def __len__(self):
+        return self.length
+
+    def strings(self,name):
+        return StringColumn(self.blocks[name+".offsets"],self.blocks[name+".data"],self.blocks[name+".valid"])
+
+    def array(self,name):
+        return self.blocks[name]
+
+    def index(self,name):
+        return IdentifierIndex(self.strings(name),self.blocks[name+".hash"],self.blocks[name+".rows"])
+
+class MappedDatabase(InchiKeyedDatabase):
+    """
+    Read-only InchiKeyedDatabase backed by a BinaryDatabase with prebuilt indexes
+    species objects are only built (by make_species(bdb,row)) when they are looked up
+    and the same object is returned for every lookup of a row
+    """
+    def __init__(self,bdb,make_species):
+        self.bdb = bdb
+        self.make_species = make_species
+        self.indexes = {name:bdb.index(name) for name in bdb.index_names}
+        self._species = dict()
+
+    def species(self,row):
+        spc = self._species.get(row)
+        if spc is None:
+            spc = self._species[row] = self.make_species(self.bdb,row)
+        return spc
+
+    @property
+    def spcs(self):
+        return [self.species(row) for row in range(len(self.bdb))]
+
+    def __len__(self):
+        return len(self.bdb)
+
+    def __contains__(self,spc):
+        return any(other is spc for other in self._species.values())
+
+    def _lookup(self,key,value):
+        if key not in self.indexes:
+            return None
+        row = self.indexes[key].get(value)
+        if row is None:
+            return None
+        return self.species(row)
+
+    def add_species(self,spc):
+        raise ValueError("MappedDatabase is read-only")
+
+    def remove_species(self,spc):
+        raise ValueError("MappedDatabase is read-only")
+
+    def get_species_inchi(self,inchi):
+        return self._lookup("inchi",inchi)
+
+    def get_species_inchikey(self,inchikey):
+        return self._lookup("inchikey",inchikey)
+
+    def get_species_name(self,name):
+        return self._lookup("name",name)
+
+    def get_species_smiles(self,smiles):
+        spc = self._lookup("smiles",smiles)
+        if spc is not None:
+            return spc
+        inchi = smiles_to_inchi(smiles)
+        if inchi is None:
+            return None
+        return self.get_species_inchi(inchi)
+
+def open_database(path):
+    """
+    Opens any binary database: solute and solvent files as SoluteStore and
+    SolventStore objects and COSMO files as a MappedDatabase of COSMOSpecies
+    """
+    bdb = BinaryDatabase(path)
+    if bdb.kind == "solute":
+        from pysolvation.solvation.solute import SoluteStore
+        return SoluteStore.from_binary(bdb)
+    elif bdb.kind == "solvent":
+        from pysolvation.solvation.solvent import SolventStore
+        return SolventStore.from_binary(bdb)
+    elif bdb.kind == "cosmo":
+        from pysolvation.cosmo.database import load_cosmo_database
+        return load_cosmo_database(path)
+    raise ValueError("Unknown binary database kind {}".format(bdb.kind))
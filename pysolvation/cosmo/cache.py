@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pysolvation.cosmo.cosmotherm import _to_list
+
+def _output_to_dict(output,species):
+    d = {"T":output.T,"Tflash":output.Tflash,"PVsat":output.PVsat,
+         "x":[output.mole_fractions.get(spc,0.0) for spc in species]}
+    for attr in ["H","Lngamma","Pvap","Gsolv"]:
+        values = output.array(attr)
+        d[attr] = _to_list(values) if values is not None else None
+    return d
+
+class COSMOCache:
+    """
+    Persistent cache of parsed COSMOtherm results stored in an SQLite file
+    entries are keyed by a hash of the contents of the .cosmo conformer files of
+    every species in the job, the mole fractions, the temperatures, the level
+    and the requested outputs, so any change to the inputs is a miss
+    entries older than max_age seconds are dropped and the least recently used
+    entries are evicted beyond max_entries
+    hits and misses count the lookups made through this object
+    """
+    def __init__(self,path,max_entries=None,max_age=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.file_hashes = dict()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path,check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS entries
+                                 (key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS entry_species
+                                 (key TEXT, inchi TEXT)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entry_species_inchi ON entry_species (inchi)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entry_species_key ON entry_species (key)")
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def hash_file(self,path):
+        """
+        returns the sha256 of the contents of the file at path
+        memoized on the path, size and modification time of the file
+        """
+        st = os.stat(path)
+        memo_key = (path,st.st_size,st.st_mtime_ns)
+        if memo_key not in self.file_hashes:
+            h = hashlib.sha256()
+            with open(path,'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20),b""):
+                    h.update(chunk)
+            self.file_hashes[memo_key] = h.hexdigest()
+        return self.file_hashes[memo_key]
+
+    def species_hash(self,spc):
+        """
+        returns a hash of the contents of all the conformer .cosmo files of spc
+        species registered in a COSMOFileStore use the hashes recorded there
+        """
+        h = hashlib.sha256()
+        digests = getattr(spc,"cosmo_hashes",None)
+        if not digests:
+            digests = [self.hash_file(os.path.join(spc.path,spc.name+"_c"+str(k)+".cosmo"))
+                       for k in range(int(spc.n_conf))]
+        for digest in digests:
+            h.update(digest.encode())
+        return h.hexdigest()
+
+    def job_key(self,job):
+        """
+        returns the cache key of a COSMOJob
+        """
+        d = {"species":[[self.species_hash(spc),job.mole_fractions[spc]] for spc in job.species],
+             "Tlist":[float(T) for T in job.Tlist],
+             "level":job.level,
+             "requested_outputs":sorted(job.requested_outputs)}
+        if job.compositions:
+            d["compositions"] = [[composition.get(spc,0.0) for spc in job.species]
+                                 for composition in job.compositions]
+        return hashlib.sha256(json.dumps(d,sort_keys=True).encode()).hexdigest()
+
+    def get(self,job):
+        """
+        Looks up the results of job, if found they are loaded into
+        job.cosmo_outputs and True is returned otherwise returns False
+        """
+        key = self.job_key(job)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT value, created FROM entries WHERE key = ?",(key,)).fetchone()
+            if row is not None and self.max_age is not None and now-row[1] > self.max_age:
+                self._delete([key])
+                row = None
+            if row is None:
+                self.misses += 1
+                return False
+            with self.conn:
+                self.conn.execute("UPDATE entries SET accessed = ? WHERE key = ?",(now,key))
+            self.hits += 1
+
+        job.reset_outputs()
+        for d in json.loads(row[0]):
+            x = d.pop("x",None)
+            mole_fractions = job.mole_fractions if x is None else dict(zip(job.species,x))
+            job.add_output(mole_fractions,**d)
+        return True
+
+    def put(self,job):
+        """
+        Stores the cosmo_outputs of a completed job
+        """
+        key = self.job_key(job)
+        value = json.dumps([_output_to_dict(output,job.species) for output in job.cosmo_outputs])
+        now = time.time()
+        with self.lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO entries VALUES (?,?,?,?)",(key,value,now,now))
+                self.conn.execute("DELETE FROM entry_species WHERE key = ?",(key,))
+                self.conn.executemany("INSERT INTO entry_species VALUES (?,?)",
+                                      [(key,spc.inchi) for spc in job.species])
+            self._evict(now)
+
+    def invalidate_species(self,spc):
+        """
+        Removes every entry for a job containing a species with the inchi of spc
+        returns the number of entries removed
+        """
+        with self.lock:
+            keys = [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT key FROM entry_species WHERE inchi = ?",(spc.inchi,))]
+            self._delete(keys)
+        return len(keys)
+
+    def clear(self):
+        """
+        Removes all entries and resets the hit and miss counters
+        """
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM entries")
+                self.conn.execute("DELETE FROM entry_species")
+            self.hits = 0
+            self.misses = 0
+
+    def _delete(self,keys):
+        with self.conn:
+            self.conn.executemany("DELETE FROM entries WHERE key = ?",[(key,) for key in keys])
+            self.conn.executemany("DELETE FROM entry_species WHERE key = ?",[(key,) for key in keys])
+
+    def _evict(self,now):
+        if self.max_age is not None:
+            self._delete([row[0] for row in self.conn.execute(
+                "SELECT key FROM entries WHERE created < ?",(now-self.max_age,))])
+        if self.max_entries is not None:
+            n = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if n > self.max_entries:
+                self._delete([row[0] for row in self.conn.execute(
+                    "SELECT key FROM entries ORDER BY accessed LIMIT ?",(n-self.max_entries,))])
@@ -0,0 +1,223 @@
+"""
+Sharded, resumable driver for COSMOtherm solvation campaigns
+
+A campaign is described by a json manifest:
+{
+    "solute_db": "solutes.csv",
+    "solvent_db": "solvents.csv",
+    "mixtures": {"water": {"water": 1.0},
+                 "water-ethanol": {"water": 0.5, "ethanol": 0.5}},
+    "temperatures": [298.15, 323.15],
+    "dT": 1.0
+}
+solute_db and solvent_db are COSMO database summary csvs (see database_summary_to_species)
+relative to the manifest, solvent_db defaults to solute_db, and mixtures map
+mixture names to the mole fractions of solvents given by their cosmo names
+
+usage:
+python -m pysolvation.cosmo.campaign run manifest.json --shard 0/4 --output-dir results
+python -m pysolvation.cosmo.campaign merge results --output results.csv
+
+run computes dGsolv and dHsolv for every (mixture, temperature, solute) in its
+shard and appends each result to results/shard-<i>-of-<N>.jsonl as it completes,
+completed results already in the journal are skipped so a crashed run can just be restarted
+merge combines the shard journals into one csv that load_campaign_results turns
+into the dictionaries taken by the fitting functions
+"""
+import os
+import sys
+import json
+import glob
+import argparse
+from pysolvation.cosmo.database import COSMODatabase, database_summary_to_species
+from pysolvation.cosmo.cosmotherm import calculate_dG_dH_solutes
+from pysolvation.cosmo.scheduler import COSMOJobScheduler
+
+def load_manifest(path):
+    """
+    Reads a campaign manifest resolving the database paths relative to it
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    for key in ["solute_db","mixtures","temperatures"]:
+        if key not in manifest:
+            raise ValueError("Campaign manifest {} is missing {}".format(path,key))
+    root = os.path.dirname(os.path.abspath(path))
+    manifest["solute_db"] = os.path.join(root,manifest["solute_db"])
+    manifest["solvent_db"] = os.path.join(root,manifest.get("solvent_db",manifest["solute_db"]))
+    manifest.setdefault("dT",1.0)
+    manifest["temperatures"] = [float(T) for T in manifest["temperatures"]]
+    return manifest
+
+def parse_shard(shard):
+    """
+    parses a shard specification "i/N" into (i, N) with 0 <= i < N
+    """
+    try:
+        i,n = [int(x) for x in shard.split("/")]
+    except ValueError:
+        raise ValueError("Shard must be given as i/N got {}".format(shard))
+    if n < 1 or not 0 <= i < n:
+        raise ValueError("Shard must satisfy 0 <= i < N got {}".format(shard))
+    return i,n
+
+def work_units(manifest,solutes):
+    """
+    returns the (mixture name, T, solute) work units of a campaign in a deterministic order
+    """
+    return [(mixture,T,solute) for mixture in manifest["mixtures"]
+            for T in manifest["temperatures"] for solute in solutes]
+
+def journal_path(output_dir,shard,nshards):
+    return os.path.join(output_dir,"shard-{}-of-{}.jsonl".format(shard,nshards))
+
+def read_journal(path):
+    """
+    returns the records in a journal file, a partially written last line is ignored
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def _append_records(path,records):
+    with open(path,'a') as f:
+        for record in records:
+            f.write(json.dumps(record)+"\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def run_shard(manifest,shard,nshards,output_dir,scheduler=None,batch_size=1,chunk_size=100):
+    """
+    Runs the work units of shard out of nshards, appending each result to the shard's
+    journal in output_dir as soon as its job completes, units already completed in the
+    journal are skipped, the solutes of each (mixture, T) are submitted to scheduler
+    chunk_size at a time, returns the number of units run
+    """
+    os.makedirs(output_dir,exist_ok=True)
+    if scheduler is None:
+        scheduler = COSMOJobScheduler()
+    solutes = database_summary_to_species(manifest["solute_db"])
+    solvents = {spc.name:spc for spc in database_summary_to_species(manifest["solvent_db"])}
+    mixtures = dict()
+    for name,fractions in manifest["mixtures"].items():
+        missing = [solvent for solvent in fractions if solvent not in solvents]
+        if missing:
+            raise ValueError("Solvents {} of mixture {} are not in {}".format(missing,name,manifest["solvent_db"]))
+        mixtures[name] = {solvents[solvent]:float(x) for solvent,x in fractions.items()}
+
+    path = journal_path(output_dir,shard,nshards)
+    done = {(r["mixture"],r["T"],r["inchi"]) for r in read_journal(path) if r["status"] == "ok"}
+    units = [unit for k,unit in enumerate(work_units(manifest,solutes))
+             if k % nshards == shard and (unit[0],unit[1],unit[2].inchi) not in done]
+
+    groups = dict()
+    for mixture,T,solute in units:
+        groups.setdefault((mixture,T),[]).append(solute)
+
+    for (mixture,T),group in groups.items():
+        def on_result(solute,dGsolv,dHsolv):
+            record = {"mixture":mixture,"T":T,"inchi":solute.inchi,"smiles":solute.smiles,
+                      "name":solute.name}
+            if dGsolv is None:
+                record.update(status="failed")
+            else:
+                record.update(status="ok",dGsolv=dGsolv,dHsolv=dHsolv)
+            _append_records(path,[record])
+
+        for i in range(0,len(group),chunk_size):
+            calculate_dG_dH_solutes(mixtures[mixture],COSMODatabase(group[i:i+chunk_size],None),
+                                    T=T,dT=manifest["dT"],scheduler=scheduler,batch_size=batch_size,
+                                    on_result=on_result)
+
+    return len(units)
+
+def merge(output_dir,output_path):
+    """
+    Combines the completed results of all shard journals in output_dir into a csv
+    with columns mixture, T, inchi, smiles, name, dGsolv and dHsolv (J/mol)
+    returns the merged DataFrame
+    """
+    import pandas as pd
+    records = dict()
+    for path in sorted(glob.glob(os.path.join(output_dir,"shard-*-of-*.jsonl"))):
+        for r in read_journal(path):
+            if r["status"] == "ok":
+                records[(r["mixture"],r["T"],r["inchi"])] = r
+    df = pd.DataFrame(list(records.values()),columns=["mixture","T","inchi","smiles","name","dGsolv","dHsolv"])
+    df.to_csv(output_path,index=False)
+    return df
+
+def load_campaign_results(path,T=None):
+    """
+    Loads a merged campaign csv as dictionaries mapping mixture names to dictionaries
+    mapping solute inchis to dGsolv and dHsolv in J/mol, as taken by fit_solvents_parameters
+    T selects the temperature and is required if the campaign has more than one
+    """
+    import pandas as pd
+    df = pd.read_csv(path)
+    Ts = sorted(set(df["T"]))
+    if T is None:
+        if len(Ts) > 1:
+            raise ValueError("Campaign has results at {} K, specify T".format(Ts))
+    else:
+        df = df[df["T"] == float(T)]
+    dGsolv_dicts = dict()
+    dHsolv_dicts = dict()
+    for mixture,group in df.groupby("mixture",sort=False):
+        dGsolv_dicts[mixture] = dict(zip(group["inchi"],group["dGsolv"]))
+        dHsolv_dicts[mixture] = dict(zip(group["inchi"],group["dHsolv"]))
+    return dGsolv_dicts,dHsolv_dicts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded, resumable COSMOtherm solvation campaigns")
+    subparsers = parser.add_subparsers(dest="command",required=True)
+
+    run_parser = subparsers.add_parser("run",help="run one shard of a campaign")
+    run_parser.add_argument("manifest")
+    run_parser.add_argument("--shard",default="0/1",help="i/N, run the i-th (0 based) of N shards")
+    run_parser.add_argument("--output-dir",default=".")
+    run_parser.add_argument("--max-workers",type=int,default=1)
+    run_parser.add_argument("--batch-size",type=int,default=1)
+    run_parser.add_argument("--chunk-size",type=int,default=100)
+    run_parser.add_argument("--timeout",type=float,default=None)
+    run_parser.add_argument("--retries",type=int,default=0)
+    run_parser.add_argument("--scratch-dir",default=None)
+    run_parser.add_argument("--cache",default=None,help="path of a COSMOCache sqlite file")
+    run_parser.add_argument("--file-store",default=None,help="root of a COSMOFileStore to stage .cosmo files from")
+    run_parser.add_argument("--local-dir",default=None,help="node-local directory caching file store objects")
+
+    merge_parser = subparsers.add_parser("merge",help="merge shard journals into one csv")
+    merge_parser.add_argument("output_dir")
+    merge_parser.add_argument("--output",default="campaign_results.csv")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        shard,nshards = parse_shard(args.shard)
+        cache = None
+        if args.cache is not None:
+            from pysolvation.cosmo.cache import COSMOCache
+            cache = COSMOCache(args.cache)
+        file_store = None
+        if args.file_store is not None:
+            from pysolvation.cosmo.filestore import COSMOFileStore
+            file_store = COSMOFileStore(args.file_store,local_dir=args.local_dir)
+        scheduler = COSMOJobScheduler(max_workers=args.max_workers,timeout=args.timeout,
+                                      max_retries=args.retries,scratch_dir=args.scratch_dir,cache=cache,
+                                      file_store=file_store)
+        n = run_shard(load_manifest(args.manifest),shard,nshards,args.output_dir,scheduler=scheduler,
+                      batch_size=args.batch_size,chunk_size=args.chunk_size)
+        print("Ran {} work units, {} failures".format(n,len(scheduler.failures)))
+    elif args.command == "merge":
+        df = merge(args.output_dir,args.output)
+        print("Merged {} results into {}".format(len(df),args.output))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
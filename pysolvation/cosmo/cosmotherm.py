@@ -1,44 +1,111 @@
 import os
-import subprocess
-from copy import deepcopy
+import shutil
+from copy import copy
+import numpy as np
+import asyncio
+from pysolvation.instrumentation import job_recorder, stage
+from pysolvation.runner import run_process_async, run_sync
+from pysolvation.cosmo.tabparser import iter_tab_blocks
+from pysolvation.cosmo.scheduler import COSMOJobScheduler, JobFailure
+from pysolvation.cosmo.results import COSMOResultStore
+from pysolvation.solvation.temperature import SolvationTemperatureFit
+from pysolvation.solvation.mixture import MixtureSolvationTable
+
+def _to_list(values):
+    """
+    converts an array of parsed values to a list with None in place of NaN
+    """
+    return [None if np.isnan(v) else float(v) for v in values]
+
+def _given(values):
+    return values is not None and len(values) > 0
 
 class COSMOOutput:
     """
     Class for storing the output of a COSMOtherm job parsed from a .tab file
     intended to be able to store any results, but currently can only
     store results of GSOLV henry and flashpoint calculations
+    the values are kept in the typed arrays of a COSMOResultStore (a new one if store
+    is None) under the job id job and this object is a lightweight view of them:
+    H, Lngamma, Pvap and Gsolv are dictionaries mapping spcs to values built when
+    accessed, use array to get the values in the order of spcs without building them
     """
+    __slots__ = ("spcs","mole_fractions","store","row","flash_row")
+
     def __init__(self,spcs,mole_fractions,H=None,Lngamma=None,Pvap=None,
-                 Gsolv=None,T=None,Tflash=None,PVsat=None):
+                 Gsolv=None,T=None,Tflash=None,PVsat=None,store=None,job=0):
+        if store is None:
+            store = COSMOResultStore(chunk_size=len(spcs) or 1)
+        self.spcs = spcs
         self.mole_fractions = mole_fractions
-        if H:
-            self.H = {spcs[i]:H[i] for i in range(len(spcs))}
-        else:
-            self.H = None
-        if Lngamma:
-            self.Lngamma = {spcs[i]:Lngamma[i] for i in range(len(spcs))}
+        self.store = store
+        if any(_given(values) for values in [H,Lngamma,Pvap,Gsolv]):
+            self.row = store.append_henry(job,spcs,mole_fractions,T,H,Lngamma,Pvap,Gsolv)
         else:
-            self.Lngamma = None
-        if Pvap:
-            self.Pvap = {spcs[i]:Pvap[i] for i in range(len(spcs))}
+            self.row = None
+        if Tflash or PVsat:
+            self.flash_row = store.append_flashpoint(job,mole_fractions,Tflash,PVsat)
         else:
-            self.Pvap = None
-        if Gsolv:
-            self.Gsolv = {spcs[i]:Gsolv[i] for i in range(len(spcs))}
-        else:
-            self.Gsolv = None
-        if T:
-            self.T = T
-        else:
-            self.T = None
-        if Tflash:
-            self.Tflash = Tflash
-        else:
-            self.Tflash = None
-        if PVsat:
-            self.PVsat = PVsat
-        else:
-            self.PVsat = None
+            self.flash_row = None
+
+    def rows(self):
+        """
+        returns the henry/GSOLV rows of the output in the store or None
+        """
+        if self.row is None:
+            return None
+        return self.store.henry_rows(self.row,len(self.spcs))
+
+    def array(self,name):
+        """
+        returns the values of name ("H", "Lngamma", "Pvap" or "Gsolv")
+        in the order of spcs as a numpy array with NaN for NA values or None
+        """
+        rows = self.rows()
+        return None if rows is None else rows[name]
+
+    def _dict(self,name):
+        values = self.array(name)
+        if values is None:
+            return None
+        return dict(zip(self.spcs,_to_list(values)))
+
+    @property
+    def H(self):
+        return self._dict("H")
+
+    @property
+    def Lngamma(self):
+        return self._dict("Lngamma")
+
+    @property
+    def Pvap(self):
+        return self._dict("Pvap")
+
+    @property
+    def Gsolv(self):
+        return self._dict("Gsolv")
+
+    @property
+    def T(self):
+        if self.row is None or len(self.spcs) == 0:
+            return None
+        T = self.rows()["T"][0]
+        return None if np.isnan(T) else float(T)
+
+    def _flashpoint(self,name):
+        if self.flash_row is None:
+            return None
+        value = self.store.flashpoint_row(self.flash_row)[name]
+        return None if np.isnan(value) else float(value)
+
+    @property
+    def Tflash(self):
+        return self._flashpoint("Tflash")
+
+    @property
+    def PVsat(self):
+        return self._flashpoint("PVsat")
 
 class COSMOJob:
     """
@@ -51,11 +118,21 @@ class COSMOJob:
     path is where you want the files saved and the name denoted on the files
     path = /directory/H2O will give you /directory/H2O.inp /directory/H2O.tab etc.
     the COSMOOutput objects are stored in the cosmo_outputs attribute
+    species with a mole fraction of 0.0 are treated as solutes at infinite dilution
+    so several solutes can share one job (see COSMOJob.infinite_dilution) and their
+    henry/GSOLV results are split out per solute in the solute_results attribute
+    fdirs maps species to the directory COSMOtherm reads their .cosmo files
+    from in place of spc.path, it is filled when files are staged from a COSMOFileStore
+    compositions is an optional list of mole fraction dictionaries, if given the
+    henry/GSOLV calculations are run for every composition at every temperature in Tlist
+    (in that order) from the one input file and each COSMOOutput holds its composition
+    results is the COSMOResultStore the parsed values are appended to (a new one by
+    default), share one between jobs to query all of their results together
     """
     supported_outputs = ["GSOLV","henry","flashpoint"]
 
     def __init__(self,species,mole_fractions=None,requested_outputs=["GSOLV"],Tlist=[298.0],path="",
-                 level="TZVPD-FINE"):
+                 level="TZVPD-FINE",compositions=None,results=None):
         if mole_fractions is None and len(species) == 1:
             mole_fractions = {species[0]:1.0}
         elif mole_fractions is None:
@@ -68,7 +145,102 @@ class COSMOJob:
         self.Tlist = Tlist
         self.path = path #no suffix path
         self.cosmo_outputs = []
+        self.solute_results = dict()
+        self.fdirs = dict()
         self.level = level
+        self.compositions = compositions
+        self.results = results
+        self.job_id = None
+
+    @classmethod
+    def infinite_dilution(cls,solvent_mole_fractions,solutes,**kwargs):
+        """
+        Creates a job computing the properties of every solute in solutes
+        at infinite dilution in the solvent mixture solvent_mole_fractions
+        all solutes are written to a single input file so COSMOtherm
+        only has to start and read the solvent files once
+        a solute that is also a solvent component is added as its own species entry
+        next to a copy of it holding the solvent mole fraction (in compositions too)
+        so the solvent composition is never changed
+        """
+        solutes = list(solutes)
+        renamed = {spc:copy(spc) for spc in solvent_mole_fractions if spc in solutes}
+        mole_fractions = {renamed.get(spc,spc):x for spc,x in solvent_mole_fractions.items()}
+        for solute in solutes:
+            mole_fractions[solute] = 0.0
+        if renamed and kwargs.get("compositions"):
+            kwargs["compositions"] = [{renamed.get(spc,spc):x for spc,x in composition.items()}
+                                      for composition in kwargs["compositions"]]
+        return cls(species=list(mole_fractions.keys()),mole_fractions=mole_fractions,**kwargs)
+
+    @property
+    def solute_compositions(self):
+        """
+        the compositions the henry/GSOLV calculations are run at
+        """
+        return self.compositions or [self.mole_fractions]
+
+    @property
+    def henry_runs(self):
+        """
+        the (composition, T) of every henry/GSOLV calculation in the order they are run
+        """
+        return [(composition,T) for composition in self.solute_compositions for T in self.Tlist]
+
+    @property
+    def solutes(self):
+        """
+        the species at infinite dilution in the job
+        """
+        return [spc for spc in self.species
+                if all(composition.get(spc,0.0) == 0.0 for composition in self.solute_compositions)]
+
+    def add_output(self,mole_fractions,**kwargs):
+        """
+        Appends a COSMOOutput of the job to cosmo_outputs with its values
+        (the COSMOOutput arguments) stored in results under job_id
+        """
+        if self.results is None:
+            self.results = COSMOResultStore()
+        if self.job_id is None:
+            self.job_id = self.results.add_job()
+        output = COSMOOutput(self.species,mole_fractions,store=self.results,job=self.job_id,**kwargs)
+        self.cosmo_outputs.append(output)
+        return output
+
+    def reset_outputs(self):
+        """
+        Clears cosmo_outputs and discards their rows from results
+        so a rerun of the job doesn't leave duplicate results in the store
+        """
+        if self.results is not None and self.job_id is not None:
+            self.results.discard_job(self.job_id)
+        self.job_id = None
+        self.cosmo_outputs = []
+        self.solute_results = dict()
+
+    def demultiplex(self):
+        """
+        Splits the henry/GSOLV outputs into per solute results
+        returns a dictionary mapping each solute to a dictionary of lists over temperature
+        with keys "T", "H", "Lngamma", "Pvap" and "Gsolv"
+        """
+        outputs = [output for output in self.cosmo_outputs if output.row is not None]
+        rows = [output.rows() for output in outputs]
+        Ts = [output.T for output in outputs]
+        columns = dict()
+        for name in COSMOResultStore.henry_columns:
+            values = np.array([r[name] for r in rows],dtype=float).reshape(len(rows),len(self.species)).T
+            columns[name] = values.astype(object)
+            columns[name][np.isnan(values)] = None
+        positions = {spc:i for i,spc in enumerate(self.species)}
+        results = dict()
+        for solute in self.solutes:
+            i = positions[solute]
+            results[solute] = {"T":list(Ts)}
+            for name in COSMOResultStore.henry_columns:
+                results[solute][name] = columns[name][i].tolist()
+        return results
 
     def generate_input_file(self):
         """
@@ -99,150 +271,273 @@ notempty wtln ehfile
             for spc in self.species:
                 mf = self.mole_fractions[spc]
                 mole_fraction_string += " " + str(mf)
-                f.write("f = \"" + spc.name + "_c0.cosmo\" fdir=\"" + spc.path + "\"")
+                fdir = self.fdirs.get(spc) or os.path.abspath(spc.path)
+                f.write("f = \"" + spc.name + "_c0.cosmo\" fdir=\"" + fdir + "\"")
                 if int(spc.n_conf) > 1:
                     f.write(" Comp = \"" + spc.name + "\" [ VPfile")
                     for k in range(1, int(spc.n_conf)):
-                        f.write("\nf = \"" + spc.name + "_c" + str(k) + ".cosmo\" fdir=\"" + spc.path + "\"")
+                        f.write("\nf = \"" + spc.name + "_c" + str(k) + ".cosmo\" fdir=\"" + fdir + "\"")
                     f.write(" ]\n")
                 else:
                     f.write(" VPfile\n")
             if "GSOLV" in self.requested_outputs or "henry" in self.requested_outputs:
-                for T in self.Tlist:
-                    f.write("henry xh={"+mole_fraction_string + "} tk=" + str(T) + " GSOLV \n")
+                for composition,T in self.henry_runs:
+                    xh_string = "".join(" " + str(composition.get(spc,0.0)) for spc in self.species)
+                    f.write("henry xh={"+xh_string + "} tk=" + str(T) + " GSOLV \n")
             if "flashpoint" in self.requested_outputs:
                 f.write("flashpoint tc=25.0 x={"+mole_fraction_string+"}use_tboil use_pvapt\n")
 
         return
 
-    def process_output(self):
+    def process_output(self,cleanup=True):
         """
         Read output from .tab file
-        Store the output in a COSMOOutput object
-        Delete all files associated with the job
+        Store the output in results with a COSMOOutput view of each calculation
+        Delete all files associated with the job unless cleanup is False
         """
         index = 0
-        jobtype = ""
-        with open("".join((self.path,".tab")), 'r') as f:
-            for line in f.readlines():
-
-                spl = line.split()
-                if len(spl) > 0:
-                    if spl[0] == "Property":
-                        if jobtype == "Henry law coefficients H":
-                            self.cosmo_outputs.append(COSMOOutput(self.species,self.mole_fractions,
-                                                                      H=Hs,Lngamma=Lngammas,Pvap=Pvaps,
-                                                                      Gsolv=Gsolvs,T=self.Tlist[index-1]))
-                        jobtype = " ".join(spl[4:-1])
-                    s = line.split()[0].strip()
-                else:
-                    s = ""
-
-                if s.isdigit() and jobtype == "Henry law coefficients H":
-                    if s == "1":
-                        index += 1
-                        Hs = []
-                        Lngammas = []
-                        Pvaps = []
-                        Gsolvs = []
-                    outs = line.split()
-                    H = outs[2]
-                    Lngamma = outs[3]
-                    Pvap = outs[4]
-                    Gsolv = outs[5]
-                    if H != "NA":
-                        Hs.append(float(H)*100000.0)
-                    else:
-                        Hs.append(None)
-                    if Lngamma != "NA":
-                        Lngammas.append(float(Lngamma))
-                    else:
-                        Lngammas.append(None)
-                    if Pvap != "NA":
-                        Pvaps.append(float(Pvap)*100000.0)
-                    else:
-                        Pvaps.append(None)
-                    Gsolvs.append(float(Gsolv)*4184.0)
-
-                elif s != "" and s[0].isdigit() and jobtype == "Flash point temperature":
-                    Tflash = float(spl[0])
-                    PVsat = float(spl[1])*100.0
-                    self.cosmo_outputs.append(COSMOOutput(self.species,self.mole_fractions,
-                                                          Tflash=Tflash,PVsat=PVsat))
-            else:
-                if jobtype == "Henry law coefficients H":
-                    self.cosmo_outputs.append(COSMOOutput(self.species,self.mole_fractions,
-                                                                  H=Hs,Lngamma=Lngammas,Pvap=Pvaps,
-                                                                  Gsolv=Gsolvs,T=self.Tlist[index-1]))
+        henry_runs = self.henry_runs
+        for block in iter_tab_blocks("".join((self.path,".tab")),n_species=len(self.species)):
+            if block.kind == "henry":
+                composition,T = henry_runs[index]
+                self.add_output(composition,H=block["H"],Lngamma=block["Lngamma"],
+                                Pvap=block["Pvap"],Gsolv=block["Gsolv"],T=T)
+                index += 1
+            elif block.kind == "flashpoint":
+                for Tflash,PVsat in zip(block["Tflash"],block["PVsat"]):
+                    self.add_output(self.mole_fractions,Tflash=float(Tflash),PVsat=float(PVsat))
+
+        self.solute_results = self.demultiplex()
+
+        if cleanup:
+            self.cleanup()
 
+    def cleanup(self):
+        """
+        Delete all files associated with the job
+        """
         os.remove("".join((self.path,".inp")))
         os.remove("".join((self.path,".tab")))
         os.remove("".join((self.path,".out")))
         os.remove("".join((self.path,"_status.xml")))
+        if os.path.exists("".join((self.path,".log"))):
+            os.remove("".join((self.path,".log")))
+        if self.fdirs:
+            shutil.rmtree("".join((self.path,"_cosmo")),ignore_errors=True)
+            self.fdirs = dict()
 
-    def run(self):
+    def run(self,timeout=None,cache=None,sink=None,file_store=None):
         """
         Run the COSMOtherm job
+        timeout is the number of seconds after which COSMOtherm is killed
+        and a subprocess.TimeoutExpired is raised
+        if a COSMOCache is given the results are taken from it when available
+        and stored in it otherwise
+        if an event sink (see pysolvation.instrumentation) is given the wall time of
+        each stage, COSMOtherm's resource usage and the file sizes are emitted to it
+        if a COSMOFileStore is given the .cosmo files are staged from it
+        into the path_cosmo directory instead of being read from spc.path
         """
-        self.generate_input_file()
-        if not "COSMOTHERM" in os.environ.keys():
-            raise ValueError("""$COSMOTHERM environment variable not defined assign
-                path of the COSMOtherm executable ex: /home/gridsan/groups/RMG/Software/COSMOtherm2021/COSMOtherm/BIN-LINUX/cosmotherm""")
-        cmd = [os.environ["COSMOTHERM"], "".join((self.path,".inp"))]
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE).wait()
-        self.process_output()
+        run_sync(self.run_async(timeout=timeout,cache=cache,sink=sink,file_store=file_store))
 
-def calculate_dG_dH_solutes(solvent_mole_fractions,cosmo_solute_db,T=298.15,dT=1.0):
+    async def run_async(self,timeout=None,cache=None,sink=None,file_store=None):
+        """
+        Coroutine version of run so many jobs can be awaited from one event loop
+        COSMOtherm's stdout and stderr are written to the .log file of the job
+        which is kept if the job fails
+        """
+        with job_recorder(sink,"COSMOJob",self.path) as recorder:
+            if file_store is not None:
+                with stage(recorder,"resolve_files"):
+                    await asyncio.to_thread(file_store.resolve,self.species)
+            if cache is not None:
+                with stage(recorder,"cache_get"):
+                    hit = await asyncio.to_thread(cache.get,self)
+                if hit:
+                    self.solute_results = self.demultiplex()
+                    return
+            if file_store is not None:
+                with stage(recorder,"stage_files"):
+                    self.fdirs = await asyncio.to_thread(file_store.stage,self.species,
+                                                         "".join((self.path,"_cosmo")))
+            with stage(recorder,"generate_input"):
+                self.generate_input_file()
+            if not "COSMOTHERM" in os.environ.keys():
+                raise ValueError("""$COSMOTHERM environment variable not defined assign
+                    path of the COSMOtherm executable ex: /home/gridsan/groups/RMG/Software/COSMOtherm2021/COSMOtherm/BIN-LINUX/cosmotherm""")
+            cmd = [os.environ["COSMOTHERM"], "".join((os.path.basename(self.path),".inp"))]
+            cwd = os.path.dirname(self.path) or None
+            log = "".join((self.path,".log"))
+            with stage(recorder,"subprocess"):
+                await run_process_async(cmd,cwd=cwd,timeout=timeout,stdout_path=log,stderr_path=log,
+                                        recorder=recorder)
+            if recorder is not None:
+                for ext in [".inp",".tab",".out",".log"]:
+                    recorder.record_file(ext[1:],"".join((self.path,ext)))
+            with stage(recorder,"process_output"):
+                self.process_output(cleanup=False)
+            with stage(recorder,"cleanup"):
+                self.cleanup()
+            if cache is not None:
+                with stage(recorder,"cache_put"):
+                    await asyncio.to_thread(cache.put,self)
+
+def _run_Gsolv_jobs(jobs,pairs_of,scheduler,nvalues,allow_missing=False,on_result=None):
     """
-    Primarily for calculating solvent parameters
-    takes in the dictionary of mole fractions {COSMOSpecies:0.2}
-    and a database of Solute objects
-    generates dictionaries mapping solute inchis to dGsolv and dHsolv
+    runs jobs, a dictionary mapping keys to (name, COSMOJob) tuples, with scheduler
+    and returns a list of (species, Gsolvs) tuples where Gsolvs are the Gsolv values
+    over the job temperatures of the solute paired with species
+    pairs_of maps each key to a list of (species, solute) pairs
+    a species without exactly nvalues Gsolv values, or with a missing (NA) value
+    unless allow_missing is True, is recorded as a JobFailure instead
+    on_result(species, Gsolvs) is called as each job completes, with None
+    as Gsolvs for the species that failed
+    """
+    if scheduler is None:
+        scheduler = COSMOJobScheduler()
+    results = []
+
+    def on_complete(key,job):
+        for spc,solute in pairs_of(key):
+            Gsolvs = None
+            if not isinstance(job,JobFailure):
+                try:
+                    Gsolvs = job.solute_results[solute]["Gsolv"]
+                    if len(Gsolvs) != nvalues:
+                        raise ValueError("Expected {} Gsolv values but COSMOtherm gave {}".format(nvalues,len(Gsolvs)))
+                    if not allow_missing and any(G is None for G in Gsolvs):
+                        raise ValueError("COSMOtherm gave NA for Gsolv at T={}".format(
+                            [T for T,G in zip(job.solute_results[solute]["T"],Gsolvs) if G is None]))
+                    results.append((spc,Gsolvs))
+                except Exception as e:
+                    scheduler.failures.append(JobFailure(spc,job.path,1,type(e).__name__,str(e),0.0))
+                    Gsolvs = None
+            if on_result is not None:
+                on_result(spc,Gsolvs)
+
+    scheduler.run(jobs,on_complete=on_complete)
+    return results
+
+def _dG_dH(Gsolvs,T,dT):
+    """
+    returns dGsolv at T and dHsolv from a central difference of Gsolvs at [T-dT,T,T+dT]
+    """
+    Gsolv = Gsolvs[1]
+    Ssolv = -(Gsolvs[2]-Gsolvs[0])/(2.0*dT)
+    return Gsolv,Gsolv + T*Ssolv
+
+def _run_dG_dH_jobs(jobs,pairs_of,scheduler,T,dT,on_result=None):
+    """
+    runs jobs at [T-dT,T,T+dT] and returns dictionaries mapping species inchis
+    to dGsolv at T and dHsolv from a central difference
+    on_result(species, dGsolv, dHsolv) is called as each job completes,
+    with None values for the species that failed
     """
     dGsolv_dict = dict()
     dHsolv_dict = dict()
-    for solute in cosmo_solute_db.spcs:
-        mole_fractions = deepcopy(solvent_mole_fractions)
-        mole_fractions[solute] = 0.0
-        spcs = list(mole_fractions.keys())
-        try:
-            job = COSMOJob(species=spcs,mole_fractions=mole_fractions,
-                       path=solute.name,Tlist=[T-dT,T,T+dT])
-            job.run()
-            Gsolvs = [output.Gsolv[solute] for output in job.cosmo_outputs]
-            Gsolv = Gsolvs[1]
-            Ssolv = -(Gsolvs[2]-Gsolvs[0])/(2.0*dT)
-            Hsolv = Gsolv + T*Ssolv
-            dGsolv_dict[solute.inchi] = Gsolv
-            dHsolv_dict[solute.inchi] = Hsolv
-        except:
-            print("Couldn't run:")
-            print(solute.smiles)
 
+    def on_Gsolvs(spc,Gsolvs):
+        if Gsolvs is None:
+            on_result(spc,None,None)
+        else:
+            on_result(spc,*_dG_dH(Gsolvs,T,dT))
+
+    for spc,Gsolvs in _run_Gsolv_jobs(jobs,pairs_of,scheduler,3,
+                                      on_result=None if on_result is None else on_Gsolvs):
+        dGsolv_dict[spc.inchi],dHsolv_dict[spc.inchi] = _dG_dH(Gsolvs,T,dT)
     return dGsolv_dict,dHsolv_dict
 
-def calculate_dG_dH_solvents(cosmo_solute,cosmo_solvents,T=298.15,dT=1.0):
+def _run_sweep_jobs(jobs,pairs_of,scheduler,Tlist):
+    """
+    runs jobs over Tlist and returns a SolvationTemperatureFit keyed by species inchis
+    """
+    results = _run_Gsolv_jobs(jobs,pairs_of,scheduler,len(Tlist),allow_missing=True)
+    dGsolv = np.array([[np.nan if G is None else G for G in Gsolvs] for _,Gsolvs in results],
+                      dtype=float).reshape(len(results),len(Tlist))
+    return SolvationTemperatureFit.fit([spc.inchi for spc,_ in results],Tlist,dGsolv)
+
+def _solute_jobs(solvent_mole_fractions,cosmo_solute_db,Tlist,batch_size,**kwargs):
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    jobs = dict()
+    solutes = list(cosmo_solute_db.spcs)
+    for i in range(0,len(solutes),batch_size):
+        batch = tuple(solutes[i:i+batch_size])
+        name = batch[0].name if batch_size == 1 else "batch{}".format(i//batch_size)
+        jobs[batch] = (name,COSMOJob.infinite_dilution(solvent_mole_fractions,batch,
+                                                       path=name,Tlist=Tlist,**kwargs))
+    return jobs
+
+def _solvent_jobs(cosmo_solute,cosmo_solvents,Tlist):
+    jobs = dict()
+    for solvent in cosmo_solvents:
+        jobs[solvent] = (solvent.name,COSMOJob.infinite_dilution({solvent:1.0},[cosmo_solute],
+                                                                 path=solvent.name,Tlist=Tlist))
+    return jobs
+
+def calculate_dG_dH_solutes(solvent_mole_fractions,cosmo_solute_db,T=298.15,dT=1.0,scheduler=None,
+                            batch_size=1,on_result=None):
+    """
+    Primarily for calculating solvent parameters
+    takes in the dictionary of mole fractions {COSMOSpecies:0.2}
+    and a database of Solute objects
+    generates dictionaries mapping solute inchis to dGsolv and dHsolv
+    the jobs are run with scheduler, a COSMOJobScheduler, (serially by default)
+    and any failures are recorded in scheduler.failures
+    batch_size solutes are packed into each COSMOtherm job, larger batches
+    save COSMOtherm startup time but a failed job loses the whole batch
+    on_result(solute, dGsolv, dHsolv) is called as each job completes, with
+    None values for the solutes that failed (ex: to save results incrementally)
+    """
+    jobs = _solute_jobs(solvent_mole_fractions,cosmo_solute_db,[T-dT,T,T+dT],batch_size)
+    return _run_dG_dH_jobs(jobs,lambda batch: [(solute,solute) for solute in batch],scheduler,T,dT,
+                           on_result=on_result)
+
+def calculate_dG_dH_solvents(cosmo_solute,cosmo_solvents,T=298.15,dT=1.0,scheduler=None):
     """
     Primarily for calculating solute parameters
     takes in a solute COSMOSpecies object
     and a list of Solvent objects
     generates dictionaries mapping solvent inchis to dGsolv and dHsolv
+    the jobs are run with scheduler, a COSMOJobScheduler, (serially by default)
+    and any failures are recorded in scheduler.failures
     """
-    dGsolv_dict = dict()
-    dHsolv_dict = dict()
-    for solvent in cosmo_solvents:
-        try:
-            job = COSMOJob(species=spcs,mole_fractions={solvent:1.0,cosmo_solute:0.0},
-                       path=solvent.name,Tlist=[T-dT,T,T+dT])
-            job.run()
-            Gsolvs = [output.Gsolv[cosmo_solute] for output in job.cosmo_outputs]
-            Gsolv = Gsolvs[1]
-            Ssolv = -(Gsolvs[2]-Gsolvs[0])/(2.0*dT)
-            Hsolv = Gsolv + T*Ssolv
-            dGsolv_dict[solvent.inchi] = Gsolv
-            dHsolv_dict[solvent.inchi] = Hsolv
-        except:
-            print("Couldn't run:")
-            print(solvent.smiles)
+    jobs = _solvent_jobs(cosmo_solute,cosmo_solvents,[T-dT,T,T+dT])
+    return _run_dG_dH_jobs(jobs,lambda solvent: [(solvent,cosmo_solute)],scheduler,T,dT)
 
-    return dGsolv_dict,dHsolv_dict
+def calculate_dG_sweep_solutes(solvent_mole_fractions,cosmo_solute_db,Tlist,scheduler=None,batch_size=1):
+    """
+    Like calculate_dG_dH_solutes but each job computes Gsolv over all the
+    temperatures in Tlist, returns a SolvationTemperatureFit keyed by solute inchis
+    giving dGsolv, dHsolv and dSsolv at any temperature in the range of Tlist
+    """
+    jobs = _solute_jobs(solvent_mole_fractions,cosmo_solute_db,list(Tlist),batch_size)
+    return _run_sweep_jobs(jobs,lambda batch: [(solute,solute) for solute in batch],scheduler,Tlist)
+
+def calculate_dG_sweep_solvents(cosmo_solute,cosmo_solvents,Tlist,scheduler=None):
+    """
+    Like calculate_dG_dH_solvents but each job computes Gsolv over all the
+    temperatures in Tlist, returns a SolvationTemperatureFit keyed by solvent inchis
+    giving dGsolv, dHsolv and dSsolv at any temperature in the range of Tlist
+    """
+    jobs = _solvent_jobs(cosmo_solute,cosmo_solvents,list(Tlist))
+    return _run_sweep_jobs(jobs,lambda solvent: [(solvent,cosmo_solute)],scheduler,Tlist)
+
+def calculate_dG_grid_solutes(solvents,compositions,cosmo_solute_db,Tlist,scheduler=None,batch_size=1):
+    """
+    Like calculate_dG_sweep_solutes but for mixtures of the COSMOSpecies in solvents
+    at every composition in compositions, mole fraction vectors in the order of solvents
+    (see pysolvation.solvation.mixture.composition_grid), each job runs the whole
+    composition and temperature grid from a single input file
+    returns a MixtureSolvationTable keyed by solute inchis giving dGsolv, dHsolv
+    and dSsolv at any composition inside the grid and temperature in the range of Tlist
+    """
+    compositions = np.asarray(compositions,dtype=float)
+    mixtures = [{solvent:float(x) for solvent,x in zip(solvents,composition)} for composition in compositions]
+    jobs = _solute_jobs(mixtures[0],cosmo_solute_db,list(Tlist),batch_size,compositions=mixtures)
+    results = _run_Gsolv_jobs(jobs,lambda batch: [(solute,solute) for solute in batch],scheduler,
+                              len(mixtures)*len(Tlist),allow_missing=True)
+    dGsolv = np.array([[np.nan if G is None else G for G in Gsolvs] for _,Gsolvs in results],
+                      dtype=float).reshape(len(results),len(mixtures),len(Tlist))
+    return MixtureSolvationTable.fit([spc.inchi for spc,_ in results],[solvent.name for solvent in solvents],
+                                     compositions,Tlist,dGsolv)
@@ -1,16 +1,26 @@
-from pysolvation.database import InchiKeyedDatabase
-import pandas as pd
+import numpy as np
+from pysolvation.database import InchiKeyedDatabase, inchi_to_inchikey
+from pysolvation.binarydb import BinaryDatabase, MappedDatabase, is_binary_database, write_database
 
 class COSMOSpecies:
     """
     Object holding all the information necessary for
+    cosmo_hashes are the sha256 of the conformer files once the species
+    has been registered in a COSMOFileStore
     """
-    def __init__(self, name, inchi, smiles, n_conf, path):
+    def __init__(self, name, inchi, smiles, n_conf, path, cosmo_hashes=None):
         self.name = name
         self.inchi = inchi
         self.smiles = smiles
         self.n_conf = n_conf
         self.path = path
+        self.cosmo_hashes = cosmo_hashes
+
+    def register(self,file_store):
+        """
+        Adds the conformer files of the species to a COSMOFileStore
+        """
+        return file_store.register_species(self)
 
 class COSMODatabase(InchiKeyedDatabase):
     """
@@ -20,16 +30,51 @@ class COSMODatabase(InchiKeyedDatabase):
         super().__init__(spcs)
         self.level = level
 
+def _inchikey(inchi):
+    if not isinstance(inchi,str):
+        return None
+    return inchi_to_inchikey(inchi) or None
+
+def save_cosmo_database(db,path):
+    """
+    Saves a COSMODatabase (or a list of COSMOSpecies) as a binary database
+    with prebuilt inchi, inchikey, smiles and name indexes
+    """
+    spcs = list(getattr(db,"spcs",db))
+    write_database(path,"cosmo",len(spcs),
+                   strings={"name":[spc.name for spc in spcs],
+                            "inchi":[spc.inchi for spc in spcs],
+                            "inchikey":[_inchikey(spc.inchi) for spc in spcs],
+                            "smiles":[spc.smiles for spc in spcs],
+                            "path":[spc.path for spc in spcs]},
+                   arrays={"n_conf":np.array([spc.n_conf for spc in spcs],dtype=np.int64)},
+                   indexed=["inchi","inchikey","smiles","name"],
+                   meta={"level":getattr(db,"level",None)})
+
+def _cosmo_species(bdb,row):
+    return COSMOSpecies(name=bdb.strings("name")[row],inchi=bdb.strings("inchi")[row],
+                        smiles=bdb.strings("smiles")[row],n_conf=int(bdb.array("n_conf")[row]),
+                        path=bdb.strings("path")[row])
+
+def load_cosmo_database(path):
+    """
+    Memory maps a binary database written by save_cosmo_database as a read-only
+    COSMODatabase, COSMOSpecies objects are only built when they are looked up
+    """
+    db = MappedDatabase(BinaryDatabase(path,kind="cosmo"),_cosmo_species)
+    db.level = db.bdb.meta["level"]
+    return db
+
 def database_summary_to_species(path):
     """
     Loads COSMOSpecies objects from a csv
+    or from a binary database written by save_cosmo_database
     """
-    db = pd.read_csv(path)
-    spcs =  []
-    for i in range(len(db)):
-        spcs.append(COSMOSpecies(name=db["cosmo name"][i],
-                                inchi=db["inchi"][i],
-                                smiles=db["smiles"][i],
-                                n_conf=db["number of conformers"][i],
-                                path=db["file path"][i]))
-    return spcs
+    if is_binary_database(path):
+        return load_cosmo_database(path).spcs
+    import pandas as pd
+    db = pd.read_csv(path,usecols=["cosmo name","inchi","smiles","number of conformers","file path"])
+    return [COSMOSpecies(name=name,inchi=inchi,smiles=smiles,n_conf=n_conf,path=path)
+            for name,inchi,smiles,n_conf,path in zip(db["cosmo name"].tolist(),db["inchi"].tolist(),
+                                                     db["smiles"].tolist(),db["number of conformers"].tolist(),
+                                                     db["file path"].tolist())]
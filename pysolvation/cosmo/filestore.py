@@ -0,0 +1,152 @@
+import os
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+def hash_file(path):
+    """
+    returns the sha256 of the contents of the file at path
+    """
+    h = hashlib.sha256()
+    with open(path,'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20),b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _copy(src,dest):
+    """
+    copies src to dest through a temporary file so dest is never seen half written
+    """
+    os.makedirs(os.path.dirname(dest),exist_ok=True)
+    tmp = "{}.tmp{}.{}".format(dest,os.getpid(),threading.get_ident())
+    shutil.copyfile(src,tmp)
+    os.chmod(tmp,0o444)
+    os.replace(tmp,dest)
+
+def _link(src,dest):
+    """
+    hardlinks src to dest falling back to a copy across filesystems
+    """
+    if os.path.exists(dest):
+        return
+    try:
+        os.link(src,dest)
+    except FileExistsError:
+        pass
+    except OSError:
+        _copy(src,dest)
+
+def conformer_file(spc,k):
+    return spc.name+"_c"+str(k)+".cosmo"
+
+class COSMOFileStore:
+    """
+    Content-addressed store of .cosmo conformer files
+    every distinct file is stored once under root/objects/<sha256[:2]>/<sha256>
+    and the sha256 of every conformer of a registered species is kept in an SQLite
+    index keyed by the species name and inchi, so jobs find their files without
+    touching the original (often shared filesystem) paths again
+    if local_dir (ex: node-local disk) is given each object is copied there the
+    first time a job on the node needs it and jobs are staged from that copy
+    files are staged into job directories by hardlinks (copies across filesystems)
+    re-register a species with register_species if its files change
+    """
+    def __init__(self,root,local_dir=None):
+        self.root = root
+        self.local_dir = local_dir
+        os.makedirs(os.path.join(root,"objects"),exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root,"index.sqlite"),timeout=60,check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS conformers
+                                 (name TEXT, inchi TEXT, conformer INTEGER, digest TEXT,
+                                  PRIMARY KEY (name, inchi, conformer))""")
+
+    def __len__(self):
+        """
+        number of distinct files in the store
+        """
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(DISTINCT digest) FROM conformers").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def object_path(self,digest,root=None):
+        return os.path.join(root or self.root,"objects",digest[:2],digest)
+
+    def add_file(self,path):
+        """
+        Adds the file at path to the store if its contents aren't already there
+        returns its sha256
+        """
+        digest = hash_file(path)
+        dest = self.object_path(digest)
+        if not os.path.exists(dest):
+            _copy(path,dest)
+        return digest
+
+    def register_species(self,spc):
+        """
+        Adds the conformer files of a COSMOSpecies to the store and indexes them
+        sets and returns spc.cosmo_hashes, the sha256 of each conformer file
+        """
+        digests = [self.add_file(os.path.join(spc.path,conformer_file(spc,k))) for k in range(int(spc.n_conf))]
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM conformers WHERE name = ? AND inchi = ?",(spc.name,spc.inchi))
+                self.conn.executemany("INSERT INTO conformers VALUES (?,?,?,?)",
+                                      [(spc.name,spc.inchi,k,digest) for k,digest in enumerate(digests)])
+        spc.cosmo_hashes = digests
+        return digests
+
+    def species_hashes(self,spc):
+        """
+        returns the sha256 of each conformer file of spc from spc.cosmo_hashes
+        or the index, registering spc if it isn't in the store yet
+        """
+        if getattr(spc,"cosmo_hashes",None):
+            return spc.cosmo_hashes
+        with self.lock:
+            rows = self.conn.execute("""SELECT digest FROM conformers WHERE name = ? AND inchi = ?
+                                        ORDER BY conformer""",(spc.name,spc.inchi)).fetchall()
+        if len(rows) == int(spc.n_conf) and all(os.path.exists(self.object_path(row[0])) for row in rows):
+            spc.cosmo_hashes = [row[0] for row in rows]
+            return spc.cosmo_hashes
+        return self.register_species(spc)
+
+    def resolve(self,species):
+        """
+        sets cosmo_hashes on every species in species (see species_hashes)
+        """
+        for spc in species:
+            self.species_hashes(spc)
+
+    def local_object(self,digest):
+        """
+        returns the path of the object to stage jobs from, copying it
+        to local_dir first if it isn't there yet
+        """
+        if self.local_dir is None:
+            return self.object_path(digest)
+        local = self.object_path(digest,self.local_dir)
+        if not os.path.exists(local):
+            _copy(self.object_path(digest),local)
+        return local
+
+    def stage(self,species,dest_dir):
+        """
+        Links the conformer files of every species in species into its own
+        subdirectory of dest_dir under the usual <name>_c<k>.cosmo names
+        returns a dictionary mapping the species to their directories
+        as taken by COSMOJob.fdirs
+        """
+        fdirs = dict()
+        for i,spc in enumerate(species):
+            fdir = os.path.join(dest_dir,str(i))
+            os.makedirs(fdir,exist_ok=True)
+            for k,digest in enumerate(self.species_hashes(spc)):
+                _link(self.local_object(digest),os.path.join(fdir,conformer_file(spc,k)))
+            fdirs[spc] = os.path.abspath(fdir)
+        return fdirs
@@ -0,0 +1,288 @@
+import os
+import shutil
+import bisect
+import tempfile
+import threading
+import numpy as np
+
+henry_dtype = np.dtype([("job","i4"),("species","i4"),("composition","i4"),("T","f8"),
+                        ("H","f8"),("Lngamma","f8"),("Pvap","f8"),("Gsolv","f8")])
+flashpoint_dtype = np.dtype([("job","i4"),("composition","i4"),("Tflash","f8"),("PVsat","f8")])
+
+class _Chunks:
+    """
+    Append only table of rows of a numpy structured dtype kept in preallocated chunks
+    of chunk_size rows, a block of rows appended together never straddles two chunks
+    the chunk being filled starts small and doubles up to chunk_size so small
+    stores (ex: the default store of a single job) don't preallocate a whole chunk
+    if spill_dir is given every full chunk is written there as a .npy file
+    and memory mapped so only the chunk being filled is held in memory
+    """
+    def __init__(self,dtype,chunk_size,spill_dir=None,prefix="chunk"):
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.spill_dir = spill_dir
+        self.prefix = prefix
+        self.chunks = []
+        self.starts = []
+        self.current = np.empty(min(chunk_size,256),dtype=dtype)
+        self.n = 0
+        self.nsealed = 0
+
+    def __len__(self):
+        return self.nsealed+self.n
+
+    def _seal(self):
+        if self.n == 0:
+            return
+        data = self.current[:self.n]
+        if self.spill_dir is not None:
+            path = os.path.join(self.spill_dir,"{}{}.npy".format(self.prefix,len(self.chunks)))
+            np.save(path,data)
+            data = np.load(path,mmap_mode='r')
+        else:
+            data = data.copy()
+        self.chunks.append(data)
+        self.starts.append(self.nsealed)
+        self.nsealed += self.n
+        self.n = 0
+
+    def reserve(self,m):
+        """
+        returns the first row and a writable view of the next m rows
+        """
+        if self.n+m > len(self.current):
+            if self.n+m <= self.chunk_size:
+                current = np.empty(min(max(2*len(self.current),self.n+m),self.chunk_size),dtype=self.dtype)
+                current[:self.n] = self.current[:self.n]
+                self.current = current
+            else:
+                self._seal()
+                self.current = np.empty(max(min(self.chunk_size,256),m),dtype=self.dtype)
+        view = self.current[self.n:self.n+m]
+        start = len(self)
+        self.n += m
+        return start,view
+
+    def get(self,start,m):
+        """
+        returns the m rows from row start, a block appended together
+        """
+        if start >= self.nsealed:
+            return self.current[start-self.nsealed:start-self.nsealed+m]
+        k = bisect.bisect_right(self.starts,start)-1
+        return self.chunks[k][start-self.starts[k]:start-self.starts[k]+m]
+
+    def arrays(self):
+        """
+        yields every chunk as a structured array
+        """
+        yield from self.chunks
+        if self.n:
+            yield self.current[:self.n]
+
+class COSMOResultStore:
+    """
+    Columnar store of parsed COSMOtherm results shared by many COSMOJob objects
+    henry/GSOLV results are kept one row per (job, species, T) in preallocated typed
+    arrays (see henry_dtype) instead of per species dictionaries, and flashpoint
+    results one row per (job, Tflash) (see flashpoint_dtype)
+    species and compositions are stored as ids into the species and compositions
+    lists, a composition is the tuple of the (species id, mole fraction) of the
+    species with non-zero mole fractions so every solute at infinite dilution in
+    the same solvent mixture shares its composition id
+    rows are kept in chunks of chunk_size rows and full chunks are spilled to
+    memory mapped files in a temporary directory under spill_dir if it is given
+    select and flashpoints return the matching rows with vectorized numpy queries
+    """
+    henry_columns = ["H","Lngamma","Pvap","Gsolv"]
+
+    def __init__(self,chunk_size=65536,spill_dir=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.spill_dir = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir,exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(prefix="results_",dir=spill_dir)
+        self.henry = _Chunks(henry_dtype,chunk_size,self.spill_dir,"henry")
+        self.flashpoint = _Chunks(flashpoint_dtype,max(1,chunk_size//16),self.spill_dir,"flashpoint")
+        self.species = []
+        self.species_index = dict()
+        self.compositions = []
+        self.composition_index = dict()
+        self.njobs = 0
+        self.discarded = set()
+        self.lock = threading.Lock()
+        self._last_species = (None,None)
+
+    def __len__(self):
+        """
+        number of henry/GSOLV rows
+        """
+        return len(self.henry)
+
+    def close(self):
+        """
+        Removes the spilled chunks, the store can't be used afterwards
+        """
+        self.henry.chunks = []
+        self.flashpoint.chunks = []
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir,ignore_errors=True)
+
+    def add_job(self):
+        """
+        returns a new job id
+        """
+        with self.lock:
+            self.njobs += 1
+            return self.njobs-1
+
+    def discard_job(self,job):
+        """
+        Excludes the rows of job from select and flashpoints (ex: a failed attempt)
+        """
+        with self.lock:
+            self.discarded.add(job)
+
+    def species_id(self,spc):
+        i = self.species_index.get(spc)
+        if i is None:
+            i = len(self.species)
+            self.species.append(spc)
+            self.species_index[spc] = i
+        return i
+
+    def species_ids(self,spcs):
+        """
+        returns the ids of the species in spcs as an array
+        memoized on the last list of species so the rows of a job only look them up once
+        """
+        last,ids = self._last_species
+        if last is not spcs or len(ids) != len(spcs):
+            ids = np.array([self.species_id(spc) for spc in spcs],dtype=np.int32)
+            self._last_species = (spcs,ids)
+        return ids
+
+    def composition_key(self,mole_fractions,add=True):
+        """
+        returns the composition tuple of a mole fraction dictionary
+        or of a single species (pure component)
+        species not in the store are added if add is True otherwise None is returned
+        """
+        if not isinstance(mole_fractions,dict):
+            mole_fractions = {mole_fractions:1.0}
+        key = []
+        for spc,x in mole_fractions.items():
+            if x != 0.0:
+                i = self.species_id(spc) if add else self.species_index.get(spc)
+                if i is None:
+                    return None
+                key.append((i,float(x)))
+        return tuple(sorted(key))
+
+    def composition_id(self,mole_fractions,add=True):
+        """
+        returns the id of the composition of mole_fractions
+        adding it (and its species) if add is True otherwise returning -1 if it isn't in the store
+        """
+        key = self.composition_key(mole_fractions,add=add)
+        i = self.composition_index.get(key)
+        if i is None:
+            if not add:
+                return -1
+            i = len(self.compositions)
+            self.compositions.append(key)
+            self.composition_index[key] = i
+        return i
+
+    def composition(self,i):
+        """
+        returns composition i as a dictionary mapping species to mole fractions
+        """
+        return {self.species[spc]:x for spc,x in self.compositions[i]}
+
+    def append_henry(self,job,spcs,mole_fractions,T,H=None,Lngamma=None,Pvap=None,Gsolv=None):
+        """
+        Appends the henry/GSOLV results of the species spcs of job at T
+        H, Lngamma, Pvap and Gsolv are sequences in the order of spcs with None or NaN
+        for missing values, columns that are not given are stored as NaN
+        returns the first row, the results are the len(spcs) rows from it
+        """
+        with self.lock:
+            ids = self.species_ids(spcs)
+            composition = self.composition_id(mole_fractions)
+            start,rows = self.henry.reserve(len(spcs))
+            rows["job"] = job
+            rows["species"] = ids
+            rows["composition"] = composition
+            rows["T"] = np.nan if T is None else T
+            for name,values in zip(self.henry_columns,[H,Lngamma,Pvap,Gsolv]):
+                rows[name] = np.nan if values is None else np.array(values,dtype=float)
+            return start
+
+    def append_flashpoint(self,job,mole_fractions,Tflash,PVsat):
+        """
+        Appends one flashpoint result of job and returns its row
+        """
+        with self.lock:
+            composition = self.composition_id(mole_fractions)
+            start,rows = self.flashpoint.reserve(1)
+            rows["job"] = job
+            rows["composition"] = composition
+            rows["Tflash"] = np.nan if Tflash is None else Tflash
+            rows["PVsat"] = np.nan if PVsat is None else PVsat
+            return start
+
+    def henry_rows(self,start,n):
+        return self.henry.get(start,n)
+
+    def flashpoint_row(self,row):
+        return self.flashpoint.get(row,1)[0]
+
+    def _ids(self,values,lookup):
+        if values is None:
+            return None
+        if isinstance(values,(list,tuple,set,np.ndarray)):
+            return np.array([lookup(value) for value in values],dtype=np.int64)
+        return np.array([lookup(values)],dtype=np.int64)
+
+    def _select(self,chunks,job=None,species=None,composition=None,T=None,atol=1e-6):
+        jobs = self._ids(job,int)
+        spcs = self._ids(species,lambda spc: self.species_index.get(spc,-1))
+        compositions = self._ids(composition,lambda x: self.composition_id(x,add=False))
+        selected = []
+        for rows in chunks.arrays():
+            mask = np.ones(len(rows),dtype=bool)
+            if self.discarded:
+                mask &= ~np.isin(rows["job"],list(self.discarded))
+            if jobs is not None:
+                mask &= np.isin(rows["job"],jobs)
+            if spcs is not None:
+                mask &= np.isin(rows["species"],spcs)
+            if compositions is not None:
+                mask &= np.isin(rows["composition"],compositions)
+            if T is not None:
+                mask &= np.abs(rows["T"]-T) <= atol
+            selected.append(rows[mask])
+        if not selected:
+            return np.empty(0,dtype=chunks.dtype)
+        return np.concatenate(selected)
+
+    def select(self,job=None,species=None,composition=None,T=None,atol=1e-6):
+        """
+        returns the henry/GSOLV rows matching every criterion given as a structured array
+        with the fields of henry_dtype (use the species and composition methods to
+        turn the ids back into objects)
+        job is a job id or a list of them, species a COSMOSpecies or a list of them,
+        composition a mole fraction dictionary, a COSMOSpecies for a pure solvent
+        or a list of these, and T a temperature matched within atol
+        ex: all Gsolv in water at 298 K: store.select(composition=water,T=298.0)["Gsolv"]
+        """
+        return self._select(self.henry,job=job,species=species,composition=composition,T=T,atol=atol)
+
+    def flashpoints(self,job=None,composition=None):
+        """
+        returns the flashpoint rows matching job and composition (see select)
+        """
+        return self._select(self.flashpoint,job=job,composition=composition)
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from pysolvation.runner import gather_limited, run_sync
+
+class JobFailure:
+    """
+    Record of a job that failed after all of its attempts
+    key is the key the job was submitted under, error_type and message
+    describe the last exception raised
+    """
+    def __init__(self,key,path,attempts,error_type,message,elapsed,tb=""):
+        self.key = key
+        self.path = path
+        self.attempts = attempts
+        self.error_type = error_type
+        self.message = message
+        self.elapsed = elapsed
+        self.traceback = tb
+
+    def __repr__(self):
+        return "JobFailure(key={!r}, attempts={}, error_type={}, message={!r})".format(
+            self.key,self.attempts,self.error_type,self.message)
+
+class COSMOJobScheduler:
+    """
+    Runs many COSMOJob objects concurrently
+    each job is given its own scratch directory under scratch_dir (a temporary
+    directory by default) so jobs with the same name do not collide,
+    the scratch directory of a job is removed once it succeeds unless keep_scratch
+    is True and kept if it fails so the path of its JobFailure can be inspected,
+    jobs are awaited together from one event loop since the work happens in the
+    COSMOtherm subprocess, max_workers limits the number of concurrent COSMOtherm processes
+    timeout is the per attempt limit in seconds on the COSMOtherm process
+    and failed jobs are retried up to max_retries times
+    failures are recorded as JobFailure objects in the failures attribute
+    if a COSMOCache is given as cache, jobs whose results are cached are not rerun
+    if an event sink is given as sink every job attempt emits its metrics to it
+    if a COSMOFileStore is given as file_store the .cosmo files of each job
+    are staged from it into the job's scratch directory
+    if a COSMOResultStore is given as results the parsed results of every job
+    are appended to it so they can be queried together
+    """
+    def __init__(self,max_workers=1,timeout=None,max_retries=0,scratch_dir=None,keep_scratch=False,
+                 cache=None,sink=None,file_store=None,results=None):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_retries < 0:
+            raise ValueError("max_retries must be non-negative")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.scratch_dir = scratch_dir
+        self.keep_scratch = keep_scratch
+        self.cache = cache
+        self.sink = sink
+        self.file_store = file_store
+        self.results = results
+        self.failures = []
+
+    async def run_job(self,key,job,name,scratch_root,on_complete=None):
+        """
+        Runs a single job in a fresh scratch directory with retries
+        returns the job if it succeeded otherwise a JobFailure
+        and passes it with key to on_complete if given
+        """
+        result = await self._run_job(key,job,name,scratch_root)
+        if on_complete is not None:
+            on_complete(key,result)
+        return result
+
+    async def _run_job(self,key,job,name,scratch_root):
+        start = time.time()
+        job_dir = tempfile.mkdtemp(prefix=name+"_",dir=scratch_root)
+        job.path = os.path.join(job_dir,name)
+        if self.results is not None:
+            job.results = self.results
+        for attempt in range(1,self.max_retries+2):
+            job.reset_outputs()
+            try:
+                await job.run_async(timeout=self.timeout,cache=self.cache,sink=self.sink,
+                                    file_store=self.file_store)
+                if not self.keep_scratch:
+                    shutil.rmtree(job_dir,ignore_errors=True)
+                return job
+            except Exception as e:
+                error = e
+                tb = traceback.format_exc()
+        return JobFailure(key,job.path,attempt,type(error).__name__,str(error),
+                          time.time()-start,tb)
+
+    def run(self,jobs,on_complete=None):
+        """
+        Runs the jobs in jobs, a dictionary mapping keys to (name, COSMOJob) tuples
+        where name is used for the files in the job's scratch directory
+        (a temporary scratch_dir is removed afterwards unless a job failed)
+        on_complete(key, job or JobFailure) is called as each job finishes
+        returns a dictionary mapping keys to the completed jobs
+        and appends a JobFailure to failures for every job that failed
+        """
+        if self.scratch_dir is None:
+            scratch_root = tempfile.mkdtemp(prefix="pysolvation_")
+        else:
+            os.makedirs(self.scratch_dir,exist_ok=True)
+            scratch_root = os.path.abspath(self.scratch_dir)
+
+        completed = dict()
+        nfailures = len(self.failures)
+        try:
+            keys = list(jobs.keys())
+            results = run_sync(gather_limited([self.run_job(key,jobs[key][1],jobs[key][0],scratch_root,on_complete)
+                                               for key in keys],self.max_workers))
+            for key,result in zip(keys,results):
+                if isinstance(result,BaseException):
+                    raise result
+                elif isinstance(result,JobFailure):
+                    self.failures.append(result)
+                else:
+                    completed[key] = result
+        finally:
+            if self.scratch_dir is None and not self.keep_scratch and len(self.failures) == nfailures:
+                shutil.rmtree(scratch_root,ignore_errors=True)
+
+        return completed
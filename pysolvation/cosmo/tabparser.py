@@ -0,0 +1,140 @@
+import numpy as np
+
+#canonical names for the compound table columns and the factors converting them to SI units
+column_names = {"h":"H","ln(gamma)":"Lngamma","lngamma":"Lngamma","ln(g)":"Lngamma",
+                "pv":"Pvap","pvap":"Pvap","p_vap":"Pvap","gsolv":"Gsolv",
+                "tb":"Tboil","tboil":"Tboil","t_boil":"Tboil"}
+unit_factors = {"H":100000.0,"Pvap":100000.0,"Gsolv":4184.0}
+
+#positional columns of the henry table used when the header can't be read
+henry_columns = ["Nr","Compound","H","Lngamma","Pvap","Gsolv"]
+
+def block_kind(title):
+    """
+    classifies a property block of a .tab file from its title
+    returns one of "henry", "gsolv", "flashpoint", "gamma", "pvap" or "unknown"
+    """
+    t = title.lower()
+    if "henry" in t:
+        return "henry"
+    elif "flash" in t:
+        return "flashpoint"
+    elif "solvation" in t or "gsolv" in t:
+        return "gsolv"
+    elif "activity" in t or "gamma" in t:
+        return "gamma"
+    elif "vapor pressure" in t or "vapour pressure" in t or "boiling" in t:
+        return "pvap"
+    return "unknown"
+
+class TabBlock:
+    """
+    One property block of a COSMOtherm .tab file
+    kind is the block type (see block_kind), job is the COSMOtherm job number,
+    T is the temperature from the job settings line if one was given
+    columns maps column names to numpy arrays indexed by species position
+    (or by row for flashpoint blocks) with NA values stored as NaN
+    compounds is the list of compound names in the block
+    """
+    def __init__(self,kind,title,job=None,T=None):
+        self.kind = kind
+        self.title = title
+        self.job = job
+        self.T = T
+        self.columns = dict()
+        self.compounds = []
+
+    def __getitem__(self,name):
+        return self.columns[name]
+
+def _parse_float(s):
+    if s == "NA":
+        return np.nan
+    try:
+        return float(s)
+    except ValueError:
+        return np.nan
+
+def _parse_settings_T(spl):
+    for i,tok in enumerate(spl):
+        if tok.startswith("T="):
+            val = tok[2:] if len(tok) > 2 else (spl[i+1] if i+1 < len(spl) else "")
+            try:
+                return float(val.rstrip(";"))
+            except ValueError:
+                return None
+    return None
+
+class _BlockBuilder:
+    def __init__(self,kind,title,job,T,n_species):
+        self.block = TabBlock(kind,title,job=job,T=T)
+        self.n_species = n_species
+        self.header = henry_columns if kind == "henry" else None
+        self.rows = []
+
+    def add_header(self,spl):
+        if self.block.kind == "henry":
+            return
+        self.header = ["Nr","Compound"]+[column_names.get(name.lower(),name) for name in spl[2:]]
+
+    def add_row(self,spl):
+        self.rows.append(spl)
+
+    def finish(self):
+        block = self.block
+        if block.kind == "flashpoint":
+            block.columns["Tflash"] = np.array([_parse_float(spl[0]) for spl in self.rows])
+            block.columns["PVsat"] = np.array([_parse_float(spl[1])*100.0 for spl in self.rows])
+            return block
+        if self.header is None:
+            self.header = ["Nr","Compound"]+["col{}".format(i) for i in range(2,max([len(spl) for spl in self.rows]+[2]))]
+        n = self.n_species if self.n_species is not None else len(self.rows)
+        names = self.header[2:]
+        values = np.full((len(names),n),np.nan)
+        block.compounds = [None]*n
+        for spl in self.rows:
+            i = int(spl[0])-1
+            if i >= n:
+                continue
+            block.compounds[i] = spl[1]
+            for j in range(min(len(names),len(spl)-2)):
+                values[j,i] = _parse_float(spl[j+2])
+        for j,name in enumerate(names):
+            block.columns[name] = values[j]*unit_factors.get(name,1.0)
+        return block
+
+def iter_tab_blocks(path,n_species=None):
+    """
+    Incrementally parses a COSMOtherm .tab file yielding a TabBlock for
+    each property block, the file is read one line at a time so only the
+    block being parsed is held in memory
+    if n_species is given the compound arrays have that length and rows are
+    placed by their compound number, otherwise one entry per row is made
+    """
+    builder = None
+    T = None
+    with open(path,'r') as f:
+        for line in f:
+            spl = line.split()
+            if not spl:
+                continue
+            first = spl[0]
+            if first == "Settings":
+                T = _parse_settings_T(spl)
+            elif first == "Property":
+                if builder is not None:
+                    yield builder.finish()
+                title = " ".join(spl[4:-1])
+                job = int(spl[2]) if len(spl) > 2 and spl[2].isdigit() else None
+                builder = _BlockBuilder(block_kind(title),title,job,T,n_species)
+            elif builder is None:
+                continue
+            elif builder.block.kind == "flashpoint":
+                if first[0].isdigit():
+                    builder.add_row(spl)
+            elif first.isdigit():
+                builder.add_row(spl)
+            elif first == "Nr":
+                builder.add_header(spl)
+    if builder is not None:
+        yield builder.finish()
@@ -1,17 +1,153 @@
-from rdkit import Chem
+from functools import lru_cache
+from pysolvation.identifiers import _resolve_chunk, get_identifier_cache
+
+@lru_cache(maxsize=65536)
+def smiles_to_inchi(smiles):
+    """
+    Converts a SMILES string to a FixedH InChI
+    memoized so repeated lookups of the same SMILES don't reparse it with RDKit
+    and looked up in (and added to) the default IdentifierCache if there is one
+    use resolve_smiles to convert many SMILES at once
+    """
+    cache = get_identifier_cache()
+    if cache is not None:
+        row = cache.get(smiles)
+        if row is not None:
+            return row[0]
+    inchi,inchikey,error = _resolve_chunk([smiles])[0]
+    if cache is not None:
+        cache.put(smiles,inchi,inchikey,error)
+    return inchi
+
+@lru_cache(maxsize=65536)
+def inchi_to_inchikey(inchi):
+    """
+    Converts an InChI to an InChIKey
+    looked up in the default IdentifierCache first if there is one
+    """
+    cache = get_identifier_cache()
+    if cache is not None:
+        inchikey = cache.get_inchikey(inchi)
+        if inchikey is not None:
+            return inchikey
+    from rdkit import Chem
+    return Chem.InchiToInchiKey(inchi)
 
 class InchiKeyedDatabase:
+    """
+    Database of species objects with dictionary indexes on the
+    inchi, inchikey, smiles and name identifiers for constant time lookups
+    when more than one species shares an identifier the first one added is returned
+    the inchikey index is only built on the first inchikey lookup since
+    generating inchikeys requires RDKit
+    """
+    indexed_keys = ["inchi","smiles","name"]
+
     def __init__(self,spcs):
-        self.spcs = spcs
+        self.spcs = []
+        self.members = dict()
+        self.indexes = {key:dict() for key in self.indexed_keys}
+        for spc in spcs:
+            self.add_species(spc)
 
-    def get_species_inchi(self,inchi):
-        for spc in self.spcs:
-            if spc.inchi == inchi:
+    def __len__(self):
+        return len(self.spcs)
+
+    def __contains__(self,spc):
+        """
+        whether spc itself (not an equal species) is in the database
+        """
+        return id(spc) in self.members
+
+    def get_identifiers(self,spc):
+        """
+        returns a dictionary mapping the indexed keys to the identifiers of spc
+        identifiers that are missing or not strings (ex: NaN from pandas) are skipped
+        """
+        identifiers = dict()
+        for key in self.indexed_keys:
+            value = getattr(spc,key,None)
+            if isinstance(value,str):
+                identifiers[key] = value
+        if "inchikey" in self.indexes:
+            inchikey = getattr(spc,"inchikey",None)
+            if not isinstance(inchikey,str) and "inchi" in identifiers:
+                inchikey = inchi_to_inchikey(identifiers["inchi"])
+            if isinstance(inchikey,str) and inchikey:
+                identifiers["inchikey"] = inchikey
+        return identifiers
+
+    def add_species(self,spc):
+        """
+        Adds a species to the database and its indexes
+        """
+        self.spcs.append(spc)
+        self.members[id(spc)] = self.members.get(id(spc),0)+1
+        for key,value in self.get_identifiers(spc).items():
+            self.indexes[key].setdefault(value,spc)
+
+    def remove_species(self,spc):
+        """
+        Removes a species from the database and its indexes
+        if another species shares an identifier with the removed
+        species the index is repointed to it
+        """
+        self.spcs.remove(spc)
+        self.members[id(spc)] -= 1
+        if self.members[id(spc)] == 0:
+            del self.members[id(spc)]
+        for key,value in self.get_identifiers(spc).items():
+            index = self.indexes[key]
+            if index.get(value) is not spc:
+                continue
+            del index[value]
+            for other in self.spcs:
+                if self.get_identifiers(other).get(key) == value:
+                    index[value] = other
+                    break
+
+    def get_species(self,inchi=None,inchikey=None,smiles=None,name=None):
+        """
+        Looks up a species by any of the indexed identifiers
+        the identifiers are tried in the order inchi, inchikey, smiles, name
+        returns None if no species matches
+        """
+        if inchi is not None:
+            spc = self.get_species_inchi(inchi)
+            if spc is not None:
                 return spc
-        else:
-            return None
+        if inchikey is not None:
+            spc = self.get_species_inchikey(inchikey)
+            if spc is not None:
+                return spc
+        if smiles is not None:
+            spc = self.get_species_smiles(smiles)
+            if spc is not None:
+                return spc
+        if name is not None:
+            return self.get_species_name(name)
+        return None
+
+    def get_species_inchi(self,inchi):
+        return self.indexes["inchi"].get(inchi)
+
+    def get_species_inchikey(self,inchikey):
+        if "inchikey" not in self.indexes:
+            self.indexes["inchikey"] = dict()
+            for spc in self.spcs:
+                value = self.get_identifiers(spc).get("inchikey")
+                if value is not None:
+                    self.indexes["inchikey"].setdefault(value,spc)
+        return self.indexes["inchikey"].get(inchikey)
+
+    def get_species_name(self,name):
+        return self.indexes["name"].get(name)
 
     def get_species_smiles(self,smiles):
-        mol = Chem.MolFromSmiles(smiles)
-        inchi = Chem.MolToInchi(mol, options='/FixedH')
+        spc = self.indexes["smiles"].get(smiles)
+        if spc is not None:
+            return spc
+        inchi = smiles_to_inchi(smiles)
+        if inchi is None:
+            return None
         return self.get_species_inchi(inchi)
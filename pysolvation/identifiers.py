@@ -0,0 +1,194 @@
+import os
+import atexit
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+def _resolve_chunk(smiles_list):
+    """
+    returns an (inchi, inchikey, error) tuple for each SMILES in smiles_list
+    where inchi and inchikey are None and error gives the reason for invalid SMILES
+    RDKit's log is blocked while converting (and restored to its previous state
+    afterwards) so invalid SMILES are only reported once in bulk
+    """
+    from rdkit import Chem, rdBase
+    with rdBase.BlockLogs():
+        results = []
+        for smiles in smiles_list:
+            mol = Chem.MolFromSmiles(smiles)
+            if mol is None:
+                results.append((None,None,"could not be parsed"))
+                continue
+            inchi = Chem.MolToInchi(mol,options='/FixedH')
+            if not inchi:
+                results.append((None,None,"InChI generation failed"))
+                continue
+            results.append((inchi,Chem.InchiToInchiKey(inchi),None))
+        return results
+
+class IdentifierCache:
+    """
+    Persistent cache of the FixedH InChI and InChIKey of SMILES stored in an SQLite file
+    invalid SMILES are cached too (with NULL identifiers) so they aren't reparsed
+    the inchi column is indexed so InChIKeys can also be looked up by InChI
+    single records added with put are buffered and written batch_size at a time
+    in one transaction (and when the cache is flushed, closed or at exit)
+    """
+    def __init__(self,path,batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = dict()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path,timeout=60,check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS identifiers
+                                 (smiles TEXT PRIMARY KEY, inchi TEXT, inchikey TEXT, error TEXT)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS identifiers_inchi ON identifiers (inchi)")
+        atexit.register(self.flush)
+
+    def __len__(self):
+        with self.lock:
+            self._write([])
+            return self.conn.execute("SELECT COUNT(*) FROM identifiers").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+        atexit.unregister(self.flush)
+
+    def _write(self,records):
+        """
+        writes the buffered records and records in one transaction, the lock must be held
+        """
+        if not self.pending and not records:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO identifiers VALUES (?,?,?,?)",
+                                  [(smiles,)+row for smiles,row in self.pending.items()])
+            self.conn.executemany("INSERT OR REPLACE INTO identifiers VALUES (?,?,?,?)",records)
+        self.pending = dict()
+
+    def flush(self):
+        """
+        Writes the records buffered by put
+        """
+        with self.lock:
+            self._write([])
+
+    def get(self,smiles):
+        """
+        returns the cached (inchi, inchikey, error) of smiles or None if it isn't cached
+        """
+        with self.lock:
+            if smiles in self.pending:
+                return self.pending[smiles]
+            return self.conn.execute("SELECT inchi, inchikey, error FROM identifiers WHERE smiles = ?",
+                                     (smiles,)).fetchone()
+
+    def get_many(self,smiles_list):
+        """
+        returns a dictionary mapping the cached SMILES of smiles_list to their (inchi, inchikey, error)
+        """
+        smiles_list = list(smiles_list)
+        found = dict()
+        with self.lock:
+            self._write([])
+            for i in range(0,len(smiles_list),500):
+                chunk = smiles_list[i:i+500]
+                rows = self.conn.execute("""SELECT smiles, inchi, inchikey, error FROM identifiers
+                                            WHERE smiles IN ({})""".format(",".join("?"*len(chunk))),chunk)
+                for smiles,inchi,inchikey,error in rows:
+                    found[smiles] = (inchi,inchikey,error)
+        return found
+
+    def get_inchikey(self,inchi):
+        """
+        returns the cached InChIKey of inchi or None if it isn't cached
+        """
+        with self.lock:
+            self._write([])
+            row = self.conn.execute("SELECT inchikey FROM identifiers WHERE inchi = ? LIMIT 1",(inchi,)).fetchone()
+        return None if row is None else row[0]
+
+    def put_many(self,records):
+        """
+        Stores records, an iterable of (smiles, inchi, inchikey, error) tuples,
+        and the buffered records in one transaction
+        """
+        with self.lock:
+            self._write(list(records))
+
+    def put(self,smiles,inchi,inchikey,error=None):
+        """
+        Buffers one record, written with the next batch_size records or on flush
+        """
+        with self.lock:
+            self.pending[smiles] = (inchi,inchikey,error)
+            if len(self.pending) >= self.batch_size:
+                self._write([])
+
+_default_cache = None
+
+def set_identifier_cache(cache):
+    """
+    Sets the IdentifierCache (or the path of one) that smiles_to_inchi, inchi_to_inchikey
+    and resolve_smiles use by default, so every database loader reuses identifiers
+    resolved in earlier runs, None disables it
+    the PYSOLVATION_IDENTIFIER_CACHE environment variable sets the path of
+    the default cache if this is never called
+    """
+    global _default_cache
+    if isinstance(cache,str):
+        cache = IdentifierCache(cache)
+    _default_cache = cache
+
+def get_identifier_cache():
+    """
+    returns the default IdentifierCache or None if there is none
+    """
+    global _default_cache
+    if _default_cache is None and os.environ.get("PYSOLVATION_IDENTIFIER_CACHE"):
+        _default_cache = IdentifierCache(os.environ["PYSOLVATION_IDENTIFIER_CACHE"])
+    return _default_cache
+
+def resolve_smiles(smiles_list,max_workers=1,chunk_size=1000,cache=None):
+    """
+    Converts the SMILES in smiles_list to FixedH InChIs and InChIKeys
+    SMILES found in cache (the default IdentifierCache if None) are not reparsed,
+    the rest are deduplicated and split into chunks of at most chunk_size (smaller
+    if needed to give every worker a chunk) that are converted in max_workers processes
+    (as many as CPUs if None), and the results are added to the cache
+    invalid SMILES do not raise, they are collected and returned together
+    returns a dictionary mapping the valid SMILES to (inchi, inchikey) tuples and
+    a dictionary mapping the invalid SMILES to the reason they could not be converted
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if cache is None:
+        cache = get_identifier_cache()
+    unique = list(dict.fromkeys(smiles_list))
+    results = cache.get_many(unique) if cache is not None else dict()
+    missing = [smiles for smiles in unique if smiles not in results]
+    if missing:
+        if max_workers != 1:
+            chunk_size = max(1,min(chunk_size,-(-len(missing)//(max_workers or os.cpu_count() or 1))))
+        chunks = [missing[i:i+chunk_size] for i in range(0,len(missing),chunk_size)]
+        if max_workers == 1 or len(chunks) == 1:
+            resolved = [_resolve_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                resolved = list(executor.map(_resolve_chunk,chunks))
+        records = [(smiles,)+result for chunk,rs in zip(chunks,resolved) for smiles,result in zip(chunk,rs)]
+        if cache is not None:
+            cache.put_many(records)
+        for smiles,inchi,inchikey,error in records:
+            results[smiles] = (inchi,inchikey,error)
+
+    identifiers = dict()
+    invalid = dict()
+    for smiles,(inchi,inchikey,error) in results.items():
+        if inchi is None:
+            invalid[smiles] = error
+        else:
+            identifiers[smiles] = (inchi,inchikey)
+    return identifiers,invalid
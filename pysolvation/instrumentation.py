@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+class MemorySink:
+    """
+    Event sink keeping events in the events list
+    """
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def emit(self,event):
+        with self.lock:
+            self.events.append(event)
+
+class JSONLinesSink:
+    """
+    Event sink appending each event as a line of json to the file at path
+    """
+    def __init__(self,path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def emit(self,event):
+        line = json.dumps(event)+"\n"
+        with self.lock:
+            with open(self.path,'a') as f:
+                f.write(line)
+
+def file_size(path):
+    """
+    returns the size of the file at path in bytes or None if it doesn't exist
+    """
+    if path is None:
+        return None
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+class JobRecorder:
+    """
+    Collects the metrics of one run of an external job and emits them
+    to sink as a single event, a dictionary with
+    "job_type", "name", "stages" mapping stage names to wall times in s,
+    "processes" a list of the child process returncodes, user and system
+    CPU times in s and peak RSS in kB, "files" mapping file labels to sizes
+    in bytes, "wall_time" and "status" ("ok" or the exception type name)
+    """
+    def __init__(self,sink,job_type,name):
+        self.sink = sink
+        self.event = {"event":"job","job_type":job_type,"name":name,"start":time.time(),
+                      "stages":dict(),"processes":[],"files":dict()}
+
+    @contextmanager
+    def stage(self,name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.event["stages"][name] = self.event["stages"].get(name,0.0)+time.perf_counter()-t
+
+    def record_process(self,returncode,rusage):
+        self.event["processes"].append({"returncode":returncode,
+                                        "cpu_user":rusage.ru_utime if rusage else None,
+                                        "cpu_system":rusage.ru_stime if rusage else None,
+                                        "max_rss_kb":rusage.ru_maxrss if rusage else None})
+
+    def record_file(self,label,path):
+        self.event["files"][label] = file_size(path)
+
+    def finish(self,status="ok"):
+        self.event["status"] = status
+        self.event["wall_time"] = time.time()-self.event["start"]
+        self.sink.emit(self.event)
+
+@contextmanager
+def job_recorder(sink,job_type,name):
+    """
+    context manager yielding a JobRecorder that emits its event to sink
+    on exit, or None if sink is None so instrumentation is optional
+    """
+    if sink is None:
+        yield None
+        return
+    recorder = JobRecorder(sink,job_type,name)
+    try:
+        yield recorder
+    except BaseException as e:
+        recorder.finish(status=type(e).__name__)
+        raise
+    recorder.finish()
+
+@contextmanager
+def stage(recorder,name):
+    """
+    times the enclosed block as stage name of recorder if recorder is not None
+    """
+    if recorder is None:
+        yield
+    else:
+        with recorder.stage(name):
+            yield
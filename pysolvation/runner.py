@@ -0,0 +1,170 @@
+import os
+import asyncio
+import contextlib
+import subprocess
+import concurrent.futures
+
+async def _wait4(pid):
+    """
+    waits for the child pid to exit without blocking the event loop
+    using a pidfd where available and polling otherwise
+    returns the wait status and the resource usage of the child
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        fd = os.pidfd_open(pid)
+    except (AttributeError,OSError):
+        fd = None
+    try:
+        delay = 0.001
+        while True:
+            wpid,status,rusage = os.wait4(pid,os.WNOHANG)
+            if wpid != 0:
+                return status,rusage
+            if fd is None:
+                await asyncio.sleep(delay)
+                delay = min(2*delay,0.05)
+                continue
+            fut = loop.create_future()
+            loop.add_reader(fd,lambda: fut.done() or fut.set_result(None))
+            try:
+                await fut
+            finally:
+                loop.remove_reader(fd)
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+def _open_log(path):
+    if path is None:
+        return subprocess.DEVNULL
+    return open(path,'ab')
+
+async def run_process_async(cmd,cwd=None,timeout=None,stdout_path=None,stderr_path=None,env=None,
+                            recorder=None):
+    """
+    Runs cmd without blocking the event loop so many processes can be awaited together
+    stdout and stderr are written by the child straight to the files at stdout_path
+    and stderr_path (discarded if None, stderr goes to the stdout file if both
+    paths are the same) so nothing is buffered in memory and the pipes can't fill up
+    env is a dictionary of variables added to the environment of the child
+    the child is killed and a subprocess.TimeoutExpired is raised after timeout seconds
+    if a JobRecorder is given as recorder the returncode and resource usage of the
+    child are recorded with it however the child ends, including when it is killed
+    returns the returncode and the resource.struct_rusage of the child
+    """
+    stdout = _open_log(stdout_path)
+    if stderr_path is not None and stderr_path == stdout_path:
+        stderr = subprocess.STDOUT
+    else:
+        stderr = _open_log(stderr_path)
+    try:
+        proc = subprocess.Popen(cmd,stdout=stdout,stderr=stderr,cwd=cwd,
+                                env=None if env is None else dict(os.environ,**env))
+    finally:
+        for f in [stdout,stderr]:
+            if hasattr(f,"close"):
+                f.close()
+
+    try:
+        status,rusage = await asyncio.wait_for(_wait4(proc.pid),timeout)
+    except BaseException as e:
+        proc.kill()
+        _,status,rusage = os.wait4(proc.pid,0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if recorder is not None:
+            recorder.record_process(proc.returncode,rusage)
+        if isinstance(e,asyncio.TimeoutError):
+            raise subprocess.TimeoutExpired(cmd,timeout)
+        raise
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if recorder is not None:
+        recorder.record_process(proc.returncode,rusage)
+    return proc.returncode,rusage
+
+def run_sync(coro):
+    """
+    Runs the coroutine coro to completion and returns its result from synchronous code
+    if an event loop is already running in this thread (ex: in Jupyter) the coroutine
+    runs in its own event loop on a worker thread since asyncio.run can't be nested
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run,coro).result()
+
+def run_process(cmd,cwd=None,timeout=None,stdout_path=None,stderr_path=None,env=None):
+    """
+    Blocking version of run_process_async
+    """
+    return run_sync(run_process_async(cmd,cwd=cwd,timeout=timeout,
+                                      stdout_path=stdout_path,stderr_path=stderr_path,env=env))
+
+async def gather_limited(coros,limit):
+    """
+    awaits the coroutines in coros with at most limit running at once
+    returns their results (or raised exceptions) in order
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*[run(coro) for coro in coros],return_exceptions=True)
+
+async def gather_cancelling(*coros):
+    """
+    awaits the coroutines together, if one raises the others are cancelled
+    (killing their subprocesses) before the exception is reraised
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks,return_exceptions=True)
+        raise
+
+class CorePool:
+    """
+    Allots cores to concurrent subprocesses so that no more than ncores
+    (by default the cores available to this process) are in use at once
+    """
+    def __init__(self,ncores=None):
+        if ncores is None:
+            ncores = len(os.sched_getaffinity(0)) if hasattr(os,"sched_getaffinity") else os.cpu_count()
+        if ncores < 1:
+            raise ValueError("ncores must be at least 1")
+        self.ncores = ncores
+        self.available = ncores
+        self._condition = None
+        self._loop = None
+
+    def _get_condition(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+        return self._condition
+
+    @contextlib.asynccontextmanager
+    async def allot(self,n):
+        """
+        waits until n cores are free and holds them until the block exits
+        """
+        if not 1 <= n <= self.ncores:
+            raise ValueError("Cannot allot {} of {} cores".format(n,self.ncores))
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.available >= n)
+            self.available -= n
+        try:
+            yield n
+        finally:
+            async with condition:
+                self.available += n
+                condition.notify_all()
@@ -1,44 +1,102 @@
 import numpy as np
-from sklearn import linear_model
-from sklearn.cross_decomposition import PLSRegression
-from scipy.optimize import least_squares, minimize, fsolve, shgo, dual_annealing
+from concurrent.futures import ProcessPoolExecutor
+from pysolvation.solvation.solvent import SolventStore
+
+solvent_parameter_bounds = [(-5, 10), # (lower bound for e,  upper bound for e)
+                            (-8, 10),  # (lower bound for s,  upper bound for s)
+                            (-2, 12), # (lower bound for a, upper bound for a)
+                            (-2, 25), # (lower bound for b, upper bound for b)
+                            (-1, 3), # (lower bound for l, upper bound for l)
+                            (-6, 6)] # (lower bound for c, upper bound for c)
 
 def loss_function(x,A,b):
     return np.mean(np.abs(np.dot(A,x)-b))
 
-def linear_fit(A,b):
+def l1_fit(A,b,bounds=None):
+    """
+    Solves min mean|Ax-b| exactly with optional bounds on x, a list of
+    (lower, upper) tuples with None for no bound
+    the linear program is solved in its dual form
+    max -b.y + l.s+ - u.s-  s.t.  A^T y = s+ - s-,  |y| <= 1/n,  s+,s- >= 0
+    which has only as many equality constraints as parameters, the
+    parameters are recovered as the multipliers of those constraints
+    returns the parameters or None if the linear program fails
     """
-    Attempts to use three methods: Linear Regression, Least Squares
-    and Dual Annealing to fit the best x to minimize |Ax-b|
+    from scipy.optimize import linprog
+    n,p = A.shape
+    if bounds is None:
+        bounds = [(None,None)]*p
+    lower = np.array([-np.inf if lo is None else lo for lo,_ in bounds],dtype=float)
+    upper = np.array([np.inf if hi is None else hi for _,hi in bounds],dtype=float)
+    c = np.concatenate([b,-np.nan_to_num(lower,neginf=0.0),np.nan_to_num(upper,posinf=0.0)])
+    A_eq = np.hstack([A.T,-np.eye(p),np.eye(p)])
+    var_bounds = ([(-1.0/n,1.0/n)]*n+
+                  [(0,None) if np.isfinite(lo) else (0,0) for lo in lower]+
+                  [(0,None) if np.isfinite(hi) else (0,0) for hi in upper])
+    res = linprog(c,A_eq=A_eq,b_eq=np.zeros(p),bounds=var_bounds,method="highs")
+    if res.status != 0:
+        return None
+    return np.clip(res.eqlin.marginals,lower,upper)
+
+def linear_fit(A,b,bounds=solvent_parameter_bounds,anneal=False):
+    """
+    Attempts to fit the best x to minimize |Ax-b| with Linear Regression
+    and the exact least absolute deviation solution (see l1_fit)
+    bounds can't lower the loss so the least absolute deviation solution within
+    bounds is only solved as a fallback if the unbounded linear program fails,
+    then Least Squares on the loss if that fails too
+    Dual Annealing within bounds is only run if anneal is True
     returns the best found parameters, the loss_function value at the
     best found parameters and the string for the method used
     """
-    reg = linear_model.LinearRegression()
+    from sklearn import linear_model
+    from scipy.optimize import least_squares, dual_annealing
+    A = np.asarray(A,dtype=float)
+    b = np.asarray(b,dtype=float)
+    if bounds is not None and len(bounds) != A.shape[1]:
+        raise ValueError("Expected {} bounds got {}".format(A.shape[1],len(bounds)))
+    if anneal and bounds is None:
+        raise ValueError("Dual Annealing requires bounds")
+
+    reg = linear_model.LinearRegression(fit_intercept=False)
     reg.fit(A, b)
-    lrparam = reg.coef_.tolist()
-    lrparam[-1] = reg.intercept_
-
-    param = least_squares(loss_function, lrparam, args=(A,b))
-    lsparam = param.x
-
-    bound   = [(-5, 10), # (lower bound for e,  upper bound for e)
-                       (-8, 10),  # (lower bound for s,  upper bound for s)
-                       (-2, 12), # (lower bound for a, upper bound for a)
-                       (-2, 25), # (lower bound for b, upper bound for b)
-                       (-1, 3), # (lower bound for l, upper bound for l)
-                       (-6, 6)] # (lower bound for c, upper bound for c)
-
-    param   = dual_annealing(loss_function,bound,args=(A,b))
-
-    daparam = param.x
+    lrparam = reg.coef_
+
+    xs = [lrparam]
+    methods = ["LR"]
+
+    l1param = l1_fit(A,b)
+    method = "L1"
+    if l1param is None and bounds is not None:
+        l1param = l1_fit(A,b,bounds)
+        method = "L1B"
+    if l1param is None:
+        l1param = least_squares(loss_function, lrparam, args=(A,b)).x
+        method = "LS"
+    xs.append(l1param)
+    methods.append(method)
+
+    if anneal:
+        param = dual_annealing(loss_function,bounds,args=(A,b),x0=np.clip(l1param,*np.array(bounds).T))
+        xs.append(param.x)
+        methods.append("DA")
 
-    xs = [lrparam,lsparam,daparam]
-    methods = ["LR","LS","DA"]
     vals = [loss_function(x,A,b) for x in xs]
     ind = np.argmin(vals)
 
     return xs[ind],vals[ind],methods[ind]
 
+def solute_design_matrix(solute_db,inchis):
+    """
+    returns the Abraham design matrix [E,S,A,B,L,1] for the solutes
+    with the given inchis, taken directly from the arrays of a SoluteStore
+    or built from the Solute objects of an InchiKeyedDatabase
+    """
+    if hasattr(solute_db,"design_matrix"):
+        return solute_db.design_matrix(inchis)
+    spcs = [solute_db.get_species_inchi(inchi) for inchi in inchis]
+    return np.array([[spc.E,spc.S,spc.A,spc.B,spc.L,1.0] for spc in spcs])
+
 def fit_solvent_parameters(solute_db,dGsolv_dict,dHsolv_dict,T=298.15):
     """
     fits solvent parameters to the species in the dGsolv_dict nad dHsolv_dict
@@ -53,13 +111,11 @@ def fit_solvent_parameters(solute_db,dGsolv_dict,dHsolv_dict,T=298.15):
 
     log10K = (-np.array(dGsolv)/(np.log(10)*8.314*298.15))
     dHsolvkJmol = np.array(dHsolv)/1000.0
-    Es = [solute_db.get_species_inchi(inchi).E for inchi in inchis]
-    Ss = [solute_db.get_species_inchi(inchi).S for inchi in inchis]
-    As = [solute_db.get_species_inchi(inchi).A for inchi in inchis]
-    Bs = [solute_db.get_species_inchi(inchi).B for inchi in inchis]
-    Ls = [solute_db.get_species_inchi(inchi).L for inchi in inchis]
-    A = np.array([Es,Ss,As,Bs,Ls,np.ones(len(Es))]).T
+    A = solute_design_matrix(solute_db,inchis)
 
+    return _fit_solvent_parameters(A,log10K,dHsolvkJmol,T)
+
+def _fit_solvent_parameters(A,log10K,dHsolvkJmol,T):
     dG_params,MAE_log10K,_ = linear_fit(A,log10K)
     dH_params,MAE_dHsolvkJmol,_ = linear_fit(A,dHsolvkJmol)
 
@@ -80,6 +136,72 @@ def fit_solvent_parameters(solute_db,dGsolv_dict,dHsolv_dict,T=298.15):
 
     return param_dict,MAE_log10K*np.log(10.0)*8.314*T,MAE_dHsolvkJmol*1000.0
 
+def _fit_masked_solvent(A,log10K,dHsolvkJmol,T):
+    """
+    fits the rows with both dG and dH, a solvent with fewer
+    such rows than parameters gets NaN parameters and MAEs
+    """
+    mask = ~(np.isnan(log10K) | np.isnan(dHsolvkJmol))
+    if mask.sum() < A.shape[1]:
+        return {name:np.nan for name in SolventStore.parameter_names},np.nan,np.nan
+    return _fit_solvent_parameters(A[mask],log10K[mask],dHsolvkJmol[mask],T)
+
+_design_matrix = None
+
+def _set_design_matrix(A):
+    """
+    worker initializer so the shared design matrix is sent to each process once
+    """
+    global _design_matrix
+    _design_matrix = A
+
+def _fit_masked_solvent_shared(log10K,dHsolvkJmol,T):
+    return _fit_masked_solvent(_design_matrix,log10K,dHsolvkJmol,T)
+
+def fit_solvents_parameters(solute_db,dGsolv_dicts,dHsolv_dicts,T=298.15,max_workers=1):
+    """
+    fits solvent parameters for many solvents at once
+    dGsolv_dicts and dHsolv_dicts map solvent labels to dictionaries mapping
+    inchis to dG or dH in J/mol as taken by fit_solvent_parameters
+    the design matrix is built once for the union of the inchis and each solvent
+    is fit to the rows it has both dG and dH for (NaN parameters and MAEs if it has
+    fewer than 6), the solvents are fit in max_workers processes which each
+    receive the design matrix once
+    returns a pandas DataFrame indexed by solvent label with the fitted
+    solvent parameters and the MAE in dG and dH in J/mol
+    """
+    import pandas as pd
+    labels = list(dGsolv_dicts.keys())
+    inchis = list(dict.fromkeys(inchi for label in labels for inchi in dGsolv_dicts[label]))
+    rows = {inchi:i for i,inchi in enumerate(inchis)}
+    A = solute_design_matrix(solute_db,inchis)
+
+    dGsolv = np.full((len(labels),len(inchis)),np.nan)
+    dHsolv = np.full((len(labels),len(inchis)),np.nan)
+    for j,label in enumerate(labels):
+        for inchi,dG in dGsolv_dicts[label].items():
+            dGsolv[j,rows[inchi]] = dG
+        for inchi,dH in dHsolv_dicts[label].items():
+            if inchi in rows:
+                dHsolv[j,rows[inchi]] = dH
+    log10K = -dGsolv/(np.log(10)*8.314*298.15)
+    dHsolvkJmol = dHsolv/1000.0
+
+    if max_workers == 1:
+        results = [_fit_masked_solvent(A,log10K[j],dHsolvkJmol[j],T) for j in range(len(labels))]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers,initializer=_set_design_matrix,
+                                 initargs=(A,)) as executor:
+            results = list(executor.map(_fit_masked_solvent_shared,log10K,dHsolvkJmol,[T]*len(labels)))
+
+    records = []
+    for param_dict,MAE_dG,MAE_dH in results:
+        record = dict(param_dict)
+        record["MAE_dG"] = MAE_dG
+        record["MAE_dH"] = MAE_dH
+        records.append(record)
+    return pd.DataFrame(records,index=pd.Index(labels,name="solvent"))
+
 def fit_solute_parameters(solvent_db,dGsolv_dict,dHsolv_dict,T=298.15):
     """
     fits solute parameters to the species in the dGsolv_dict and dHsolv_dict
@@ -94,13 +216,19 @@ def fit_solute_parameters(solvent_db,dGsolv_dict,dHsolv_dict,T=298.15):
 
     log10K = (-np.array(dGsolv)/(np.log(10)*8.314*T))
     dHsolvkJmol = np.array(dHsolv)/1000.0
+    scalefactor = np.log(10)*8.314*T/1000.0
+    if hasattr(solvent_db,"g_params"):
+        g_params = solvent_db.g_params[solvent_db.indices(inchis)]
+        mask = np.nan_to_num(g_params[:,5]) != 0.0
+        A = scalefactor*g_params[mask,:5]
+        b = (log10K[mask]-g_params[mask,5])*scalefactor
+        return _fit_solute_parameters(A,b)
+
     A = []
     b = []
-    scalefactor = np.log(10)*8.314*T/1000.0
     for i,inchi in enumerate(inchis):
         solv = solvent_db.get_species_inchi(inchi)
         if solv.cg:
-            print(solv.smiles)
             A.append((scalefactor*np.array([solv.eg,solv.sg,solv.ag,solv.bg,solv.lg])).tolist())
             b.append((log10K[i]-solv.cg)*scalefactor)
 #         if solv.ch:
@@ -110,7 +238,10 @@ def fit_solute_parameters(solvent_db,dGsolv_dict,dHsolv_dict,T=298.15):
     A = np.array(A)
     b = np.array(b)
 
-    params,MAE,_ = linear_fit(A,b)
+    return _fit_solute_parameters(A,b)
+
+def _fit_solute_parameters(A,b):
+    params,MAE,_ = linear_fit(A,b,bounds=None)
 
     param_dict = dict()
     param_dict["E"] = params[0]
@@ -0,0 +1,277 @@
+import json
+import numpy as np
+from pysolvation.solvation.fitting import solute_design_matrix, _fit_solvent_parameters, _fit_solute_parameters
+from pysolvation.solvation.solute import SoluteStore
+from pysolvation.solvation.solvent import SolventStore
+
+class IncrementalLinearFit:
+    """
+    Least squares fit of b = A x kept up to date as observations are added and removed
+    the sufficient statistics A^T A, A^T b, b^T b and n are updated in O(p^2) per
+    observation and the parameters and RMSE are recomputed from them in O(p^3),
+    independent of the number of observations
+    observations are kept by key so they can be removed or replaced, refit and the
+    mean absolute error (which has no sufficient statistics) use them in O(n)
+    """
+    def __init__(self,nparams):
+        self.nparams = nparams
+        self.observations = dict()
+        self.AtA = np.zeros((nparams,nparams))
+        self.Atb = np.zeros(nparams)
+        self.btb = 0.0
+        self._params = None
+
+    def __len__(self):
+        return len(self.observations)
+
+    def __contains__(self,key):
+        return key in self.observations
+
+    def _accumulate(self,A,b,sign):
+        self.AtA += sign*np.dot(A.T,A)
+        self.Atb += sign*np.dot(A.T,b)
+        self.btb += sign*float(np.dot(b,b))
+        self._params = None
+
+    def update(self,keys,A,b):
+        """
+        Adds the observations rows A and values b under keys
+        observations already in the fit under the same key are replaced
+        and so are earlier rows of the batch repeating a key
+        """
+        keys = list(keys)
+        A = np.asarray(A,dtype=float).reshape(len(keys),self.nparams)
+        b = np.asarray(b,dtype=float).reshape(len(keys))
+        last = list({key:i for i,key in enumerate(keys)}.values())
+        if len(last) != len(keys):
+            keys = [keys[i] for i in last]
+            A = A[last]
+            b = b[last]
+        self.remove([key for key in keys if key in self.observations])
+        self._accumulate(A,b,1.0)
+        for key,a,y in zip(keys,A,b):
+            self.observations[key] = (a,float(y))
+
+    def add(self,key,a,b):
+        self.update([key],[a],[b])
+
+    def remove(self,keys):
+        """
+        Removes the observations under keys, keys not in the fit are ignored
+        """
+        removed = [self.observations.pop(key) for key in keys if key in self.observations]
+        if removed:
+            self._accumulate(np.array([a for a,_ in removed]),np.array([y for _,y in removed]),-1.0)
+
+    def recompute(self):
+        """
+        Rebuilds the sufficient statistics from the observations
+        to discard round off accumulated over many updates
+        """
+        _,A,b = self.data()
+        self.AtA[:] = 0.0
+        self.Atb[:] = 0.0
+        self.btb = 0.0
+        self._accumulate(A,b,1.0)
+
+    def data(self):
+        """
+        returns the keys, the (n,p) design matrix and the values of the observations
+        """
+        keys = list(self.observations.keys())
+        A = np.array([a for a,_ in self.observations.values()],dtype=float).reshape(len(keys),self.nparams)
+        b = np.array([y for _,y in self.observations.values()],dtype=float)
+        return keys,A,b
+
+    @property
+    def params(self):
+        """
+        the least squares parameters (minimum norm if underdetermined)
+        """
+        if self._params is None:
+            self._params = np.linalg.lstsq(self.AtA,self.Atb,rcond=None)[0]
+        return self._params
+
+    @property
+    def RMSE(self):
+        if not self.observations:
+            return np.nan
+        x = self.params
+        sse = self.btb-2.0*np.dot(x,self.Atb)+np.dot(x,np.dot(self.AtA,x))
+        return float(np.sqrt(max(sse,0.0)/len(self.observations)))
+
+    def MAE(self):
+        if not self.observations:
+            return np.nan
+        _,A,b = self.data()
+        return float(np.mean(np.abs(np.dot(A,self.params)-b)))
+
+    def to_dict(self):
+        return {"nparams":self.nparams,
+                "keys":list(self.observations.keys()),
+                "A":[a.tolist() for a,_ in self.observations.values()],
+                "b":[y for _,y in self.observations.values()]}
+
+    @classmethod
+    def from_dict(cls,d):
+        fit = cls(d["nparams"])
+        if d["keys"]:
+            fit.update(d["keys"],d["A"],d["b"])
+        return fit
+
+class _IncrementalFit:
+    """
+    shared json serialization of the solvent and solute fitters
+    """
+    def save(self,path):
+        with open(path,'w') as f:
+            json.dump(self.to_dict(),f)
+
+    @classmethod
+    def load(cls,path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+class IncrementalSolventFit(_IncrementalFit):
+    """
+    Online version of fit_solvent_parameters for one solvent
+    the dG and dH fits are IncrementalLinearFit objects keyed by solute inchi so
+    new or corrected solute data only costs time proportional to the change
+    params and the RMSEs are least squares results kept up to date on every change,
+    refit runs the full linear_fit selection on the data accumulated so far
+    """
+    def __init__(self,T=298.15):
+        self.T = T
+        self.dG_fit = IncrementalLinearFit(6)
+        self.dH_fit = IncrementalLinearFit(6)
+
+    def __len__(self):
+        return len(self.dG_fit)
+
+    def add(self,solute_db,dGsolv_dict,dHsolv_dict):
+        """
+        Adds (or replaces) the solutes in both dGsolv_dict and dHsolv_dict
+        which map inchis to dG or dH in J/mol, assumes each is in solute_db
+        """
+        inchis = [inchi for inchi in dGsolv_dict if inchi in dHsolv_dict]
+        A = solute_design_matrix(solute_db,inchis)
+        log10K = -np.array([dGsolv_dict[inchi] for inchi in inchis],dtype=float)/(np.log(10)*8.314*298.15)
+        dHsolvkJmol = np.array([dHsolv_dict[inchi] for inchi in inchis],dtype=float)/1000.0
+        self.dG_fit.update(inchis,A,log10K)
+        self.dH_fit.update(inchis,A,dHsolvkJmol)
+
+    def remove(self,inchis):
+        inchis = list(inchis)
+        self.dG_fit.remove(inchis)
+        self.dH_fit.remove(inchis)
+
+    @property
+    def param_dict(self):
+        names = SolventStore.parameter_names
+        return dict(zip(names,np.concatenate([self.dG_fit.params,self.dH_fit.params]).tolist()))
+
+    @property
+    def RMSE_dG(self):
+        return self.dG_fit.RMSE*np.log(10.0)*8.314*self.T
+
+    @property
+    def RMSE_dH(self):
+        return self.dH_fit.RMSE*1000.0
+
+    def MAE_dG(self):
+        return self.dG_fit.MAE()*np.log(10.0)*8.314*self.T
+
+    def MAE_dH(self):
+        return self.dH_fit.MAE()*1000.0
+
+    def result(self):
+        """
+        returns the parameter dictionary and the MAE in dG and dH in J/mol
+        of the current least squares fit like fit_solvent_parameters
+        """
+        return self.param_dict,self.MAE_dG(),self.MAE_dH()
+
+    def refit(self):
+        """
+        fits the accumulated data with fit_solvent_parameters' full linear_fit selection
+        """
+        inchis,A,log10K = self.dG_fit.data()
+        dHsolvkJmol = np.array([self.dH_fit.observations[inchi][1] for inchi in inchis])
+        return _fit_solvent_parameters(A,log10K,dHsolvkJmol,self.T)
+
+    def to_dict(self):
+        return {"T":self.T,"dG_fit":self.dG_fit.to_dict(),"dH_fit":self.dH_fit.to_dict()}
+
+    @classmethod
+    def from_dict(cls,d):
+        fit = cls(d["T"])
+        fit.dG_fit = IncrementalLinearFit.from_dict(d["dG_fit"])
+        fit.dH_fit = IncrementalLinearFit.from_dict(d["dH_fit"])
+        return fit
+
+class IncrementalSoluteFit(_IncrementalFit):
+    """
+    Online version of fit_solute_parameters for one solute
+    the fit is an IncrementalLinearFit keyed by solvent inchi, solvents
+    without a c_g coefficient are skipped as in fit_solute_parameters
+    """
+    def __init__(self,T=298.15):
+        self.T = T
+        self.fit = IncrementalLinearFit(5)
+
+    def __len__(self):
+        return len(self.fit)
+
+    def add(self,solvent_db,dGsolv_dict,dHsolv_dict=None):
+        """
+        Adds (or replaces) the solvents in dGsolv_dict which maps solvent inchis
+        to dG in J/mol, assumes each is in solvent_db, dHsolv_dict is not used
+        """
+        scalefactor = np.log(10)*8.314*self.T/1000.0
+        keys = []
+        A = []
+        b = []
+        for inchi,dG in dGsolv_dict.items():
+            solv = solvent_db.get_species_inchi(inchi)
+            if solv.cg:
+                keys.append(inchi)
+                A.append(scalefactor*np.array([solv.eg,solv.sg,solv.ag,solv.bg,solv.lg]))
+                b.append((-dG/(np.log(10)*8.314*self.T)-solv.cg)*scalefactor)
+        self.fit.update(keys,A,b)
+
+    def remove(self,inchis):
+        self.fit.remove(list(inchis))
+
+    @property
+    def param_dict(self):
+        return dict(zip(SoluteStore.parameter_names,self.fit.params.tolist()))
+
+    @property
+    def RMSE(self):
+        return self.fit.RMSE*1000.0
+
+    def MAE(self):
+        return self.fit.MAE()*1000.0
+
+    def result(self):
+        """
+        returns the parameter dictionary and the MAE in J/mol of the
+        current least squares fit like fit_solute_parameters
+        """
+        return self.param_dict,self.MAE()
+
+    def refit(self):
+        """
+        fits the accumulated data with fit_solute_parameters' full linear_fit selection
+        """
+        _,A,b = self.fit.data()
+        return _fit_solute_parameters(A,b)
+
+    def to_dict(self):
+        return {"T":self.T,"fit":self.fit.to_dict()}
+
+    @classmethod
+    def from_dict(cls,d):
+        fit = cls(d["T"])
+        fit.fit = IncrementalLinearFit.from_dict(d["fit"])
+        return fit
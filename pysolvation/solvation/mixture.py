@@ -0,0 +1,131 @@
+import itertools
+import numpy as np
+from pysolvation.solvation.temperature import SolvationTemperatureFit
+
+def composition_grid(ncomponents,steps):
+    """
+    returns the mole fraction vectors of the lattice with spacing 1/steps covering
+    every composition of a mixture of ncomponents, an (n,ncomponents) array
+    """
+    points = [p for p in itertools.product(range(steps+1),repeat=ncomponents-1) if sum(p) <= steps]
+    return np.array([list(p)+[steps-sum(p)] for p in points],dtype=float)/steps
+
+class MixtureSolvationTable:
+    """
+    Interpolation table of dGsolv(x,T) for many solutes in mixtures of the same solvents
+    at every grid composition dGsolv(T) is fitted with the form of SolvationTemperatureFit
+    and the fit coefficients, and so dGsolv, dHsolv and dSsolv at any T, are interpolated
+    linearly between grid compositions: along the mole fraction of the first solvent for
+    binary mixtures and over a Delaunay triangulation of the grid for more solvents
+    keys are the solute identifiers (ex: inchis) in the row order of coeffs, components
+    the solvent names, compositions an (m,ncomponents) array of grid mole fractions,
+    coeffs an (n,m,3) array and MAE an (n,m) array of fit errors in J/mol
+    """
+    def __init__(self,keys,components,compositions,coeffs,Tmin,Tmax,MAE):
+        self.keys = list(keys)
+        self.index = {key:i for i,key in enumerate(self.keys)}
+        self.components = list(components)
+        self.compositions = np.asarray(compositions,dtype=float)
+        self.coeffs = np.asarray(coeffs,dtype=float)
+        self.Tmin = Tmin
+        self.Tmax = Tmax
+        self.MAE = np.asarray(MAE,dtype=float)
+        if self.compositions.shape[1] != len(self.components):
+            raise ValueError("compositions must have one column per component")
+        self._order = np.argsort(self.compositions[:,0])
+        self._triangulation = None
+
+    @classmethod
+    def fit(cls,keys,components,compositions,Tlist,dGsolv):
+        """
+        fits dGsolv, an (n,len(compositions),len(Tlist)) array in J/mol with NaN for missing values
+        """
+        dGsolv = np.asarray(dGsolv,dtype=float)
+        n,m,nT = dGsolv.shape
+        fit = SolvationTemperatureFit.fit(range(n*m),Tlist,dGsolv.reshape(n*m,nT))
+        return cls(keys,components,compositions,fit.coeffs.reshape(n,m,3),fit.Tmin,fit.Tmax,fit.MAE.reshape(n,m))
+
+    def _composition(self,x):
+        if isinstance(x,dict):
+            x = [x.get(component,0.0) for component in self.components]
+        x = np.asarray(x,dtype=float)
+        if x.shape != (len(self.components),) or abs(x.sum()-1.0) > 1e-6:
+            raise ValueError("Composition must give mole fractions summing to 1 for {}".format(self.components))
+        return x
+
+    def weights(self,x):
+        """
+        returns the indices of the grid compositions around x and their interpolation weights
+        raises a ValueError if x is outside of the grid
+        """
+        x = self._composition(x)
+        if len(self.components) == 1:
+            return np.array([0]),np.array([1.0])
+        if len(self.components) == 2:
+            grid = self.compositions[self._order,0]
+            j = int(np.searchsorted(grid,x[0]))
+            if j < len(grid) and grid[j] == x[0]:
+                return self._order[[j]],np.array([1.0])
+            if j == 0 or j == len(grid):
+                raise ValueError("Composition {} is outside of the grid".format(x))
+            w = (x[0]-grid[j-1])/(grid[j]-grid[j-1])
+            return self._order[[j-1,j]],np.array([1.0-w,w])
+        if self._triangulation is None:
+            from scipy.spatial import Delaunay
+            self._triangulation = Delaunay(self.compositions[:,:-1])
+        tri = self._triangulation
+        p = x[:-1]
+        simplex = int(tri.find_simplex(p))
+        if simplex < 0:
+            raise ValueError("Composition {} is outside of the grid".format(x))
+        T = tri.transform[simplex]
+        b = np.dot(T[:-1],p-T[-1])
+        return tri.simplices[simplex],np.append(b,1.0-b.sum())
+
+    def at(self,x,keys=None):
+        """
+        returns the SolvationTemperatureFit of keys (all solutes by default)
+        interpolated at the composition x, a mole fraction vector in the order
+        of components or a dictionary mapping component names to mole fractions
+        """
+        indices,w = self.weights(x)
+        keys = self.keys if keys is None else list(keys)
+        rows = slice(None) if keys is self.keys else [self.index[key] for key in keys]
+        coeffs = np.einsum("nmk,m->nk",self.coeffs[rows][:,indices],w)
+        MAE = np.dot(self.MAE[rows][:,indices],w)
+        return SolvationTemperatureFit(keys,coeffs,self.Tmin,self.Tmax,MAE)
+
+    def dGsolv(self,x,T,keys=None):
+        """
+        dGsolv in J/mol at composition x and T (a scalar or array) for keys
+        """
+        return self.at(x,keys).dGsolv(T)
+
+    def dHsolv(self,x,T,keys=None):
+        """
+        dHsolv in J/mol at composition x and T for keys
+        """
+        return self.at(x,keys).dHsolv(T)
+
+    def dSsolv(self,x,T,keys=None):
+        """
+        dSsolv in J/mol/K at composition x and T for keys
+        """
+        return self.at(x,keys).dSsolv(T)
+
+    def save(self,path):
+        """
+        Saves the table to a compressed .npz file
+        """
+        np.savez_compressed(path,keys=np.array(self.keys,dtype=str),components=np.array(self.components,dtype=str),
+                            compositions=self.compositions,coeffs=self.coeffs,MAE=self.MAE,
+                            Trange=np.array([self.Tmin,self.Tmax]))
+
+    @classmethod
+    def load(cls,path):
+        """
+        Loads a table saved with save
+        """
+        with np.load(path) as d:
+            return cls(d["keys"].tolist(),d["components"].tolist(),d["compositions"],d["coeffs"],
+                       float(d["Trange"][0]),float(d["Trange"][1]),d["MAE"])
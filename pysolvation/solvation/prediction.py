@@ -0,0 +1,80 @@
+import numpy as np
+from pysolvation.solvation.solute import SoluteStore
+from pysolvation.solvation.solvent import SolventStore
+
+def as_solute_store(solutes):
+    """
+    returns solutes as a SoluteStore, accepts a SoluteStore,
+    an InchiKeyedDatabase of Solute objects or a list of Solute objects
+    """
+    if isinstance(solutes,SoluteStore):
+        return solutes
+    if hasattr(solutes,"spcs"):
+        solutes = solutes.spcs
+    return SoluteStore.from_solutes(solutes)
+
+def as_solvent_store(solvents):
+    """
+    returns solvents as a SolventStore, accepts a SolventStore,
+    an InchiKeyedDatabase of Solvent objects or a list of Solvent objects
+    """
+    if isinstance(solvents,SolventStore):
+        return solvents
+    if hasattr(solvents,"spcs"):
+        solvents = solvents.spcs
+    return SolventStore.from_solvents(solvents)
+
+def predict_log10K(solutes,solvents):
+    """
+    predicts log10K at 298.15 K for every solute in every solvent
+    from the Abraham solute parameters and the solvent g coefficients
+    returns an (N,M) array, NaN where a solvent is missing coefficients
+    """
+    solutes = as_solute_store(solutes)
+    solvents = as_solvent_store(solvents)
+    return np.dot(solutes.design_matrix(),solvents.g_params.T)
+
+def predict_dGsolv(solutes,solvents):
+    """
+    predicts dGsolv at 298.15 K in J/mol for every solute in every solvent
+    returns an (N,M) array
+    """
+    return -predict_log10K(solutes,solvents)*np.log(10)*8.314*298.15
+
+def predict_dHsolv(solutes,solvents):
+    """
+    predicts dHsolv in J/mol for every solute in every solvent
+    from the Abraham solute parameters and the solvent h coefficients
+    returns an (N,M) array
+    """
+    solutes = as_solute_store(solutes)
+    solvents = as_solvent_store(solvents)
+    return np.dot(solutes.design_matrix(),solvents.h_params.T)*1000.0
+
+def predict_dGsolv_T(solutes,solvents,Tlist):
+    """
+    predicts dGsolv in J/mol for every solute in every solvent at every
+    temperature in Tlist, extrapolating from 298.15 K assuming constant
+    dHsolv and dSsolv:  dG(T) = dH + (dG(298.15)-dH)*T/298.15
+    returns a (len(Tlist),N,M) array (see predict_solvation)
+    """
+    return predict_solvation(solutes,solvents,Tlist)["dGsolv"]
+
+def predict_solvation(solutes,solvents,Tlist=[298.15]):
+    """
+    predicts the solvation properties of every solute in every solvent
+    returns a dictionary with
+    "log10K": (len(Tlist),N,M) partition coefficients
+    "dGsolv": (len(Tlist),N,M) solvation free energies in J/mol
+    "dHsolv": (N,M) solvation enthalpies in J/mol
+    "dSsolv": (N,M) solvation entropies in J/mol/K
+    """
+    solutes = as_solute_store(solutes)
+    solvents = as_solvent_store(solvents)
+    dH = predict_dHsolv(solutes,solvents)
+    dG298 = predict_dGsolv(solutes,solvents)
+    dS = (dH-dG298)/298.15
+    Ts = np.asarray(Tlist,dtype=float)
+    dG = dH[None,:,:] - Ts[:,None,None]*dS[None,:,:]
+    log10K = -dG/(np.log(10)*8.314*Ts[:,None,None])
+    return {"log10K":log10K,"dGsolv":dG,"dHsolv":dH,"dSsolv":dS}
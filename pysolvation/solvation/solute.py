@@ -1,4 +1,6 @@
-import pandas as pd
+import numpy as np
+from pysolvation.database import smiles_to_inchi
+from pysolvation.binarydb import BinaryDatabase, is_binary_database, write_database
 
 class Solute:
     """
@@ -13,19 +15,156 @@ class Solute:
         self.B = B
         self.L = L
 
+class SoluteView:
+    """
+    Lightweight stand-in for a Solute backed by a row of a SoluteStore
+    it has the attributes of a Solute but only the two slots of its own (no __dict__)
+    reads and writes go straight through to the store's arrays
+    """
+    __slots__ = ("store","index")
+
+    def __init__(self,store,index):
+        self.store = store
+        self.index = index
+
+    def _get_param(self,col):
+        return float(self.store.data[self.index,col])
+
+    def _set_param(self,col,value):
+        self.store.data[self.index,col] = value
+
+    smiles = property(lambda self: self.store.smiles[self.index])
+    inchi = property(lambda self: self.store.inchi[self.index])
+    E = property(lambda self: self._get_param(0), lambda self,v: self._set_param(0,v))
+    S = property(lambda self: self._get_param(1), lambda self,v: self._set_param(1,v))
+    A = property(lambda self: self._get_param(2), lambda self,v: self._set_param(2,v))
+    B = property(lambda self: self._get_param(3), lambda self,v: self._set_param(3,v))
+    L = property(lambda self: self._get_param(4), lambda self,v: self._set_param(4,v))
+
+class SoluteStore:
+    """
+    Columnar store of solute identifiers and Abraham parameters
+    data is an (N,6) float array with columns E, S, A, B, L, 1 so that it is
+    directly the Abraham design matrix used for fitting and prediction
+    supports the get_species_inchi/get_species_smiles lookups of InchiKeyedDatabase
+    and hands out SoluteView objects that behave like Solute objects
+    """
+    parameter_names = ["E","S","A","B","L"]
+
+    def __init__(self,smiles,inchi,params):
+        self.smiles = np.asarray(smiles,dtype=object)
+        self.inchi = np.asarray(inchi,dtype=object)
+        params = np.asarray(params,dtype=float)
+        if params.shape != (len(self.inchi),len(self.parameter_names)):
+            raise ValueError("params must have shape ({},{})".format(len(self.inchi),len(self.parameter_names)))
+        self.data = np.ones((len(self.inchi),len(self.parameter_names)+1))
+        self.data[:,:-1] = params
+        self.inchi_index = dict()
+        for i,inchi in enumerate(self.inchi):
+            self.inchi_index.setdefault(inchi,i)
+
+    @classmethod
+    def from_solutes(cls,solutes):
+        """
+        Builds a SoluteStore from a list of Solute objects
+        """
+        return cls(smiles=[spc.smiles for spc in solutes],
+                   inchi=[spc.inchi for spc in solutes],
+                   params=[[spc.E,spc.S,spc.A,spc.B,spc.L] for spc in solutes])
+
+    @classmethod
+    def from_binary(cls,bdb):
+        """
+        Builds a SoluteStore on top of a memory mapped BinaryDatabase without copying
+        its arrays or decoding its identifiers, writes to parameters stay in this process
+        """
+        store = cls.__new__(cls)
+        store.smiles = bdb.strings("smiles")
+        store.inchi = bdb.strings("inchi")
+        store.data = bdb.array("data")
+        store.inchi_index = bdb.index("inchi")
+        return store
+
+    def __len__(self):
+        return len(self.inchi)
+
+    def __getitem__(self,index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SoluteStore index out of range")
+        return SoluteView(self,index)
+
+    def __iter__(self):
+        return (SoluteView(self,i) for i in range(len(self)))
+
+    @property
+    def spcs(self):
+        return list(self)
+
+    @property
+    def params(self):
+        """
+        (N,5) view of the E, S, A, B, L columns
+        """
+        return self.data[:,:-1]
+
+    def indices(self,inchis):
+        """
+        returns the row indices of the solutes with the given inchis
+        raises a KeyError if any of the inchis is not in the store
+        """
+        return np.array([self.inchi_index[inchi] for inchi in inchis],dtype=np.intp)
+
+    def design_matrix(self,inchis=None):
+        """
+        returns the (N,6) Abraham design matrix [E,S,A,B,L,1]
+        for all solutes (without copying) or for the solutes with the given inchis
+        """
+        if inchis is None:
+            return self.data
+        return self.data[self.indices(inchis)]
+
+    def get_species_inchi(self,inchi):
+        i = self.inchi_index.get(inchi)
+        if i is None:
+            return None
+        return SoluteView(self,i)
+
+    def get_species_smiles(self,smiles):
+        inchi = smiles_to_inchi(smiles)
+        if inchi is None:
+            return None
+        return self.get_species_inchi(inchi)
+
+def save_solute_store(solutes,path):
+    """
+    Saves a SoluteStore (or a list or InchiKeyedDatabase of Solute objects)
+    as a binary database that load_solute_store memory maps
+    """
+    if not isinstance(solutes,SoluteStore):
+        solutes = SoluteStore.from_solutes(getattr(solutes,"spcs",solutes))
+    write_database(path,"solute",len(solutes),strings={"smiles":solutes.smiles,"inchi":solutes.inchi},
+                   arrays={"data":solutes.data},indexed=["inchi"])
+
+def load_solute_store(path):
+    """
+    Function for loading a SoluteStore from a csv
+    with the solute parameters and smiles and inchi identifiers
+    or from a binary database written by save_solute_store
+    """
+    if is_binary_database(path):
+        return SoluteStore.from_binary(BinaryDatabase(path,kind="solute"))
+    import pandas as pd
+    db = pd.read_csv(path,usecols=["smiles","inchi"]+SoluteStore.parameter_names)
+    return SoluteStore(smiles=db["smiles"].to_numpy(dtype=object),
+                       inchi=db["inchi"].to_numpy(dtype=object),
+                       params=db[SoluteStore.parameter_names].to_numpy(dtype=float))
+
 def load_solutes(path):
     """
     Function for loading Solute objects from a csv
     with the solute parameters and smiles and inchi identifiers
+    the returned objects are views into a single SoluteStore
     """
-    db = pd.read_csv(path)
-    spcs =  []
-    for i in range(len(db)):
-        spcs.append(Solute(smiles=db["smiles"][i],
-                                inchi=db["inchi"][i],
-                                E=db["E"][i],
-                                S=db["S"][i],
-                                A=db["A"][i],
-                                B=db["B"][i],
-                                L=db["L"][i]))
-    return spcs
+    return list(load_solute_store(path))
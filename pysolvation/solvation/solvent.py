@@ -1,8 +1,14 @@
+import numpy as np
+from pysolvation.database import InchiKeyedDatabase, smiles_to_inchi
+from pysolvation.identifiers import resolve_smiles
+from pysolvation.binarydb import BinaryDatabase, is_binary_database, write_database
+
 class Solvent:
     """
     Stores Solvent identifiers and parameters
     """
     def __init__(self,name,smiles,inchi,cg,eg,sg,ag,bg,lg,ch,eh,sh,ah,bh,lh):
+        self.name = name
         self.smiles = smiles
         self.inchi = inchi
         self.cg = cg
@@ -18,21 +24,211 @@ class Solvent:
         self.bh = bh
         self.lh = lh
 
-def getsolvrmgdb(rmgdb,curated_names=None):
+def _param_property(col):
+    return property(lambda self: self._get_param(col), lambda self,v: self._set_param(col,v))
+
+class SolventView:
+    """
+    Lightweight stand-in for a Solvent backed by a row of a SolventStore
+    it has the attributes of a Solvent but only the two slots of its own (no __dict__)
+    missing (NaN) coefficients are returned as None like on Solvent objects
+    """
+    __slots__ = ("store","index")
+
+    def __init__(self,store,index):
+        self.store = store
+        self.index = index
+
+    def _get_param(self,col):
+        v = self.store.data[self.index,col]
+        if np.isnan(v):
+            return None
+        return float(v)
+
+    def _set_param(self,col,value):
+        self.store.data[self.index,col] = np.nan if value is None else value
+
+    name = property(lambda self: self.store.name[self.index])
+    smiles = property(lambda self: self.store.smiles[self.index])
+    inchi = property(lambda self: self.store.inchi[self.index])
+    eg = _param_property(0)
+    sg = _param_property(1)
+    ag = _param_property(2)
+    bg = _param_property(3)
+    lg = _param_property(4)
+    cg = _param_property(5)
+    eh = _param_property(6)
+    sh = _param_property(7)
+    ah = _param_property(8)
+    bh = _param_property(9)
+    lh = _param_property(10)
+    ch = _param_property(11)
+
+class SolventStore:
+    """
+    Columnar store of solvent identifiers and Abraham solvent coefficients
+    data is an (M,12) float array with columns
+    e_g, s_g, a_g, b_g, l_g, c_g, e_h, s_h, a_h, b_h, l_h, c_h
+    ordered to match the [E,S,A,B,L,1] solute design matrix so g_params and h_params
+    can be multiplied with it directly, missing coefficients are NaN
+    supports the get_species_inchi/get_species_smiles lookups of InchiKeyedDatabase
+    and hands out SolventView objects that behave like Solvent objects
+    """
+    parameter_names = ["e_g","s_g","a_g","b_g","l_g","c_g",
+                       "e_h","s_h","a_h","b_h","l_h","c_h"]
+    attribute_names = [name.replace("_","") for name in parameter_names]
+
+    def __init__(self,name,smiles,inchi,params):
+        self.name = np.asarray(name,dtype=object)
+        self.smiles = np.asarray(smiles,dtype=object)
+        self.inchi = np.asarray(inchi,dtype=object)
+        self.data = np.array(params,dtype=float)
+        if self.data.shape != (len(self.inchi),len(self.parameter_names)):
+            raise ValueError("params must have shape ({},{})".format(len(self.inchi),len(self.parameter_names)))
+        self.inchi_index = dict()
+        for i,inchi in enumerate(self.inchi):
+            self.inchi_index.setdefault(inchi,i)
+
+    @classmethod
+    def from_solvents(cls,solvents):
+        """
+        Builds a SolventStore from a list of Solvent objects
+        """
+        params = [[np.nan if getattr(solv,attr) is None else getattr(solv,attr)
+                   for attr in cls.attribute_names] for solv in solvents]
+        return cls(name=[solv.name for solv in solvents],
+                   smiles=[solv.smiles for solv in solvents],
+                   inchi=[solv.inchi for solv in solvents],
+                   params=np.array(params,dtype=float).reshape(len(solvents),len(cls.parameter_names)))
+
+    @classmethod
+    def from_binary(cls,bdb):
+        """
+        Builds a SolventStore on top of a memory mapped BinaryDatabase without copying
+        its arrays or decoding its identifiers, writes to coefficients stay in this process
+        """
+        store = cls.__new__(cls)
+        store.name = bdb.strings("name")
+        store.smiles = bdb.strings("smiles")
+        store.inchi = bdb.strings("inchi")
+        store.data = bdb.array("data")
+        store.inchi_index = bdb.index("inchi")
+        return store
+
+    def __len__(self):
+        return len(self.inchi)
+
+    def __getitem__(self,index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SolventStore index out of range")
+        return SolventView(self,index)
+
+    def __iter__(self):
+        return (SolventView(self,i) for i in range(len(self)))
+
+    @property
+    def spcs(self):
+        return list(self)
+
+    @property
+    def g_params(self):
+        """
+        (M,6) view of the e_g, s_g, a_g, b_g, l_g, c_g columns
+        """
+        return self.data[:,:6]
+
+    @property
+    def h_params(self):
+        """
+        (M,6) view of the e_h, s_h, a_h, b_h, l_h, c_h columns
+        """
+        return self.data[:,6:]
+
+    def indices(self,inchis):
+        """
+        returns the row indices of the solvents with the given inchis
+        raises a KeyError if any of the inchis is not in the store
+        """
+        return np.array([self.inchi_index[inchi] for inchi in inchis],dtype=np.intp)
+
+    def get_species_inchi(self,inchi):
+        i = self.inchi_index.get(inchi)
+        if i is None:
+            return None
+        return SolventView(self,i)
+
+    def get_species_smiles(self,smiles):
+        inchi = smiles_to_inchi(smiles)
+        if inchi is None:
+            return None
+        return self.get_species_inchi(inchi)
+
+def save_solvent_store(solvents,path):
+    """
+    Saves a SolventStore (or a list or InchiKeyedDatabase of Solvent objects)
+    as a binary database that load_solvent_store memory maps
+    """
+    if not isinstance(solvents,SolventStore):
+        solvents = SolventStore.from_solvents(getattr(solvents,"spcs",solvents))
+    write_database(path,"solvent",len(solvents),
+                   strings={"name":solvents.name,"smiles":solvents.smiles,"inchi":solvents.inchi},
+                   arrays={"data":solvents.data},indexed=["inchi"])
+
+def load_solvent_store(path):
+    """
+    Function for loading a SolventStore from a csv with name, smiles and inchi
+    identifiers and c_g, e_g, ... l_h solvent coefficient columns
+    or from a binary database written by save_solvent_store
+    """
+    if is_binary_database(path):
+        return SolventStore.from_binary(BinaryDatabase(path,kind="solvent"))
+    import pandas as pd
+    db = pd.read_csv(path,usecols=["name","smiles","inchi"]+SolventStore.parameter_names)
+    return SolventStore(name=db["name"].to_numpy(dtype=object),
+                        smiles=db["smiles"].to_numpy(dtype=object),
+                        inchi=db["inchi"].to_numpy(dtype=object),
+                        params=db[SolventStore.parameter_names].to_numpy(dtype=float))
+
+def load_solvents(path):
+    """
+    Function for loading Solvent objects from a csv
+    the returned objects are views into a single SolventStore
+    """
+    return list(load_solvent_store(path))
+
+def getsolvrmgdb(rmgdb,curated_names=None,include_mixtures=False,max_workers=1):
+    """
+    Makes an InchiKeyedDatabase of Solvent objects from the RMG solvent library
+    mixture solvents are skipped unless include_mixtures is True in which case
+    they are identified by the "." joined smiles of their components
+    (see MixtureSolvationTable for solvation in mixtures at arbitrary compositions)
+    the SMILES are converted together with resolve_smiles in max_workers processes
+    raises a ValueError listing every entry whose SMILES could not be converted
+    """
     solvlib = rmgdb.solvation.libraries['solvent']
-    solvs = []
+    entries = []
     for index,entry in solvlib.entries.items():
-        if len(entry.item) > 1:
+        if len(entry.item) > 1 and not include_mixtures:
             continue #ignore mixture solvents
 
         if curated_names and not (entry.label in curated_names):
             continue
 
-        spc = entry.item[0]
-        mol = Chem.MolFromSmiles(spc.smiles)
-        inchi = Chem.MolToInchi(mol, options='/FixedH')
+        entries.append((".".join(spc.smiles for spc in entry.item),entry))
+
+    identifiers,invalid = resolve_smiles([smiles for smiles,_ in entries],max_workers=max_workers)
+    if invalid:
+        raise ValueError("Could not convert the SMILES of solvents: {}".format(
+            ", ".join("{} ({}: {})".format(entry.label,smiles,invalid[smiles])
+                      for smiles,entry in entries if smiles in invalid)))
+
+    solvs = []
+    for smiles,entry in entries:
+        inchi = identifiers[smiles][0]
         d = entry.data
-        solv = Solvent(entry.label,spc.smiles,inchi,d.c_g,d.e_g,d.s_g,d.a_g,d.b_g,d.l_g,
+        solv = Solvent(entry.label,smiles,inchi,d.c_g,d.e_g,d.s_g,d.a_g,d.b_g,d.l_g,
                        d.c_h,d.e_h,d.s_h,d.a_h,d.b_h,d.l_h)
         solvs.append(solv)
     return InchiKeyedDatabase(solvs)
@@ -0,0 +1,101 @@
+import numpy as np
+
+class SolvationTemperatureFit:
+    """
+    Smooth fits of dGsolv(T) for many species at once with the constant
+    heat capacity form  dG(T) = a + b*T + c*T*ln(T)
+    so that  dS(T) = -b - c*(ln(T)+1),  dH(T) = a - c*T  and  dCp = -c
+    (with fewer than 3 temperatures c = 0, constant dH and dS)
+    keys are the species identifiers (ex: inchis) in the row order of coeffs,
+    an (n,3) array of a, b, c in J/mol and J/mol/K, Tmin and Tmax are the
+    fitted temperature range and MAE the mean absolute fit error in J/mol per species
+    """
+    def __init__(self,keys,coeffs,Tmin,Tmax,MAE):
+        self.keys = list(keys)
+        self.index = {key:i for i,key in enumerate(self.keys)}
+        self.coeffs = np.asarray(coeffs,dtype=float)
+        self.Tmin = Tmin
+        self.Tmax = Tmax
+        self.MAE = np.asarray(MAE,dtype=float)
+
+    @staticmethod
+    def basis(Tlist,nterms=3):
+        Ts = np.asarray(Tlist,dtype=float)
+        return np.column_stack([np.ones_like(Ts),Ts,Ts*np.log(Ts)][:nterms])
+
+    @classmethod
+    def fit(cls,keys,Tlist,dGsolv):
+        """
+        fits dGsolv, an (n,len(Tlist)) array in J/mol with NaN for missing values,
+        solving one least squares problem for every group of species
+        that share the same missing values
+        """
+        dGsolv = np.asarray(dGsolv,dtype=float)
+        Ts = np.asarray(Tlist,dtype=float)
+        n = dGsolv.shape[0]
+        coeffs = np.full((n,3),np.nan)
+        MAE = np.full(n,np.nan)
+        masks,groups = np.unique(~np.isnan(dGsolv),axis=0,return_inverse=True)
+        for g,mask in enumerate(masks):
+            rows = np.flatnonzero(groups.ravel() == g)
+            nterms = min(3,int(mask.sum()))
+            if nterms == 0:
+                continue
+            B = cls.basis(Ts[mask],nterms)
+            y = dGsolv[np.ix_(rows,np.flatnonzero(mask))].T
+            x = np.linalg.lstsq(B,y,rcond=None)[0]
+            coeffs[rows,:nterms] = x.T
+            coeffs[rows,nterms:] = 0.0
+            MAE[rows] = np.mean(np.abs(np.dot(B,x)-y),axis=0)
+        return cls(keys,coeffs,Ts.min(),Ts.max(),MAE)
+
+    def _coeffs(self,keys):
+        if keys is None:
+            return self.coeffs
+        return self.coeffs[[self.index[key] for key in keys]]
+
+    def dGsolv(self,T,keys=None):
+        """
+        dGsolv in J/mol at T (a scalar or array) for keys (all species by default)
+        returns an (n,) array for scalar T and an (n,len(T)) array otherwise
+        """
+        a,b,c = self._coeffs(keys).T
+        Ts = np.asarray(T,dtype=float)
+        if Ts.ndim:
+            return a[:,None] + np.multiply.outer(b,Ts) + np.multiply.outer(c,Ts*np.log(Ts))
+        return a + b*Ts + c*Ts*np.log(Ts)
+
+    def dSsolv(self,T,keys=None):
+        """
+        dSsolv in J/mol/K at T for keys, shaped like dGsolv
+        """
+        _,b,c = self._coeffs(keys).T
+        Ts = np.asarray(T,dtype=float)
+        if Ts.ndim:
+            return -b[:,None] - np.multiply.outer(c,np.log(Ts)+1.0)
+        return -b - c*(np.log(Ts)+1.0)
+
+    def dHsolv(self,T,keys=None):
+        """
+        dHsolv in J/mol at T for keys, shaped like dGsolv
+        """
+        a,_,c = self._coeffs(keys).T
+        Ts = np.asarray(T,dtype=float)
+        if Ts.ndim:
+            return a[:,None] - np.multiply.outer(c,Ts)
+        return a - c*Ts
+
+    def to_dicts(self,T=298.15):
+        """
+        returns dictionaries mapping keys to dGsolv and dHsolv at T
+        as taken by the fitting functions, species without a fit are skipped
+        """
+        dG = self.dGsolv(T)
+        dH = self.dHsolv(T)
+        dGsolv_dict = dict()
+        dHsolv_dict = dict()
+        for key,G,H in zip(self.keys,dG,dH):
+            if not (np.isnan(G) or np.isnan(H)):
+                dGsolv_dict[key] = G
+                dHsolv_dict[key] = H
+        return dGsolv_dict,dHsolv_dict
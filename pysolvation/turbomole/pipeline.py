@@ -0,0 +1,101 @@
+import os
+import time
+import shutil
+import asyncio
+import traceback
+from pysolvation.runner import CorePool, run_sync
+from pysolvation.cosmo.database import COSMODatabase
+from pysolvation.cosmo.scheduler import JobFailure
+from pysolvation.turbomole.turbomole import TurbomoleJob, turbomoletospecies
+
+class ConformerPipeline:
+    """
+    Runs the Turbomole calculations for many conformers of many species concurrently
+    and turns the results into multi-conformer COSMOSpecies
+    every calculation is allotted cores_per_job cores out of the ncores of the node
+    (all the cores available to this process by default) so the node stays full
+    conformer k of species name runs in path/name/c<k> and the outputs of the
+    conformers that succeeded end up renumbered as path/name/<name>_c<k>.cosmo and .energy
+    timeout is the per calculation limit in seconds and failed conformers are retried
+    up to max_retries times, failures are recorded as JobFailure objects keyed by
+    (name, conformer) in the failures attribute
+    """
+    def __init__(self,path,ncores=None,cores_per_job=1,timeout=None,max_retries=0,sink=None,
+                 cosmo_level="BP-TZVPD-FINE-COSMO-SP",energy_level="BP-TZVPD-GAS-SP"):
+        if max_retries < 0:
+            raise ValueError("max_retries must be non-negative")
+        self.path = path
+        self.ncores = ncores
+        self.cores_per_job = cores_per_job
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.sink = sink
+        self.cosmo_level = cosmo_level
+        self.energy_level = energy_level
+        self.species = []
+        self.failures = []
+
+    def add_species(self,name,inchi,smiles,xyzs,charge=0,multiplicity=1):
+        """
+        Queues a species with a list of conformer geometries in xyz format (without the header lines)
+        """
+        self.species.append((name,inchi,smiles,list(xyzs),charge,multiplicity))
+
+    async def run_conformer(self,job,pool):
+        """
+        Runs one conformer job with retries
+        returns the job if it succeeded otherwise a JobFailure
+        """
+        start = time.time()
+        for attempt in range(1,self.max_retries+2):
+            try:
+                await job.run_async(timeout=self.timeout,sink=self.sink,pool=pool,cores=self.cores_per_job)
+                return job
+            except Exception as e:
+                error = e
+                tb = traceback.format_exc()
+        return JobFailure((job.name,job.conformer),job.path,attempt,type(error).__name__,str(error),
+                          time.time()-start,tb)
+
+    async def run_async(self,pool):
+        jobs = []
+        for name,inchi,smiles,xyzs,charge,multiplicity in self.species:
+            for k,xyz in enumerate(xyzs):
+                job_dir = os.path.join(self.path,name,"c"+str(k))
+                os.makedirs(job_dir,exist_ok=True)
+                jobs.append(TurbomoleJob(name,xyz,charge,multiplicity,path=job_dir,cosmo_level=self.cosmo_level,
+                                         energy_level=self.energy_level,conformer=k))
+        return await asyncio.gather(*[self.run_conformer(job,pool) for job in jobs])
+
+    def run(self,db=None,level=None,file_store=None):
+        """
+        Runs every queued conformer and adds a COSMOSpecies for every species with at least
+        one successful conformer to db (a new COSMODatabase at level by default)
+        the .cosmo files are registered in file_store if a COSMOFileStore is given
+        the working directories of successful conformers are removed, those of failed ones kept
+        returns the database
+        """
+        if db is None:
+            db = COSMODatabase([],level)
+        results = run_sync(self.run_async(CorePool(self.ncores)))
+        completed = dict()
+        for result in results:
+            if isinstance(result,JobFailure):
+                self.failures.append(result)
+            else:
+                completed.setdefault(result.name,[]).append(result)
+        for name,inchi,smiles,xyzs,charge,multiplicity in self.species:
+            if name not in completed:
+                continue
+            conformers = sorted(completed[name],key=lambda job: job.conformer)
+            species_dir = os.path.join(self.path,name)
+            for job in conformers:
+                for attr in ["output_cosmo_file","output_energy_file"]:
+                    dest = os.path.join(species_dir,os.path.basename(getattr(job,attr)))
+                    os.replace(getattr(job,attr),dest)
+                    setattr(job,attr,dest)
+            db.add_species(turbomoletospecies(name,inchi,smiles,conformers,file_store=file_store))
+            for job in conformers:
+                shutil.rmtree(job.path,ignore_errors=True)
+        self.species = []
+        return db
@@ -1,6 +1,9 @@
 import os
-import subprocess
-from cosmo.cosmotherm import COSMOSpecies
+import asyncio
+import contextlib
+from pysolvation.instrumentation import job_recorder, stage
+from pysolvation.runner import run_process_async, gather_cancelling, run_sync
+from pysolvation.cosmo.database import COSMOSpecies
 
 class TurbomoleJob:
     """
@@ -8,10 +11,13 @@ class TurbomoleJob:
     path is where you want the files saved and the name denoted on the files
     path = /directory/H2O will give you /directory/H2O.inp /directory/H2O.tab etc.
     the COSMOOutput objects are stored in the cosmo_outputs attribute
+    the cosmo and energy calculations each run in their own subdirectory of path
+    and their outputs are saved as path/<name>_c<conformer>.cosmo (cosmo_level)
+    and path/<name>_c<conformer>.energy (gas phase energy at energy_level)
     """
 
     def __init__(self,name,xyz,charge,multiplicity,path="",cosmo_level="BP-TZVPD-FINE-COSMO-SP",
-                energy_level="BP-TZVPD-GAS-SP"):
+                energy_level="BP-TZVPD-GAS-SP",conformer=0):
         self.name = name
         self.xyz = xyz.strip()
         self.charge = charge
@@ -19,58 +25,134 @@ class TurbomoleJob:
         self.cosmo_level = cosmo_level
         self.energy_level = energy_level
         self.path = path
+        self.conformer = conformer
         self.num_atoms = xyz.count('\n') + 1
         self.output_energy_file = None
         self.output_cosmo_file = None
 
+    @property
+    def levels(self):
+        """
+        dictionary mapping the calculation subdirectories to their levels
+        """
+        return {"cosmo":self.cosmo_level,"energy":self.energy_level}
+
     def generate_input_file(self):
         """
-        Create Turbomole input files for job
+        Create Turbomole input files for job, one set per calculation
+        so the calculations don't share a working directory
         """
-        try:
-            os.mkdir(os.path.join(self.path,"xyz"))
-        except:
-            pass
+        for label in self.levels:
+            os.makedirs(os.path.join(self.path,label,"xyz"),exist_ok=True)
 
-        with open(os.path.join(self.path,self.name+".txt"),'wt') as f:
-            f.write(self.name+" "+str(self.charge)+" "+str(self.multiplicity))
+            with open(os.path.join(self.path,label,self.name+".txt"),'wt') as f:
+                f.write(self.name+" "+str(self.charge)+" "+str(self.multiplicity))
 
-        with open(os.path.join(self.path,"xyz",self.name+".xyz"),"wt") as f:
-            f.write(str(self.num_atoms)+"\n\n"+self.xyz)
+            with open(os.path.join(self.path,label,"xyz",self.name+".xyz"),"wt") as f:
+                f.write(str(self.num_atoms)+"\n\n"+self.xyz)
 
         return
 
-    def process_output(self):
+    def process_output(self,cleanup=True):
         """
-        checks that the output file is there
+        moves the .cosmo file of the cosmo calculation and the .energy file of the
+        gas phase energy calculation to path/<name>_c<conformer>.cosmo and .energy
+        and deletes the input files unless cleanup is False
         """
-        os.rename(os.path.join(self.path,"CosmofilesBP-TZVPD-FINE-COSMO-SP",self.name+".cosmo"),
-                 os.path.join(self.path,self.name+"_c0.cosmo"))
-        os.rename(os.path.join(self.path,"EnergyfilesBP-TZVPD-FINE-COSMO-SP",self.name+".energy"),
-                 os.path.join(self.path,self.name+"_c0.energy"))
-        if os.path.isfile(os.path.join(self.path,self.name+"_c0.energy")):
-            self.output_energy_file = os.path.abspath(os.path.join(self.path,self.name+"_c0.energy"))
-        if os.path.isfile(os.path.join(self.path,self.name+"_c0.cosmo")):
-            self.output_cosmo_file = os.path.abspath(os.path.join(self.path,self.name+"_c0.cosmo"))
-        os.remove(os.path.join(self.path,"xyz",self.name+".xyz"))
-        os.remove(os.path.join(self.path,self.name+".txt"))
+        output = os.path.join(self.path,self.name+"_c"+str(self.conformer))
+        os.rename(os.path.join(self.path,"cosmo","Cosmofiles"+self.cosmo_level,self.name+".cosmo"),output+".cosmo")
+        os.rename(os.path.join(self.path,"energy","Energyfiles"+self.energy_level,self.name+".energy"),
+                  output+".energy")
+        if os.path.isfile(output+".energy"):
+            self.output_energy_file = os.path.abspath(output+".energy")
+        if os.path.isfile(output+".cosmo"):
+            self.output_cosmo_file = os.path.abspath(output+".cosmo")
+        if cleanup:
+            self.cleanup()
 
-    def run(self):
+    def cleanup(self):
         """
-        Run the COSMOtherm job
+        Deletes the input files of the job
         """
-        self.generate_input_file()
-        #Note you need to have sourced Turbomole for this to work
-        #ex: source /home/gridsan/groups/RMG/Software/TmoleX19/TURBOMOLE/Config_turbo_env
-        cmd = ['calculate', '-l', self.name+'.txt','-m',self.cosmo_level,'-f','xyz','-din','xyz','>',self.name+'.log']
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE).wait()
-        cmd = ['calculate', '-l', self.name+'.txt','-m',self.energy_level,'-f','xyz','-din','xyz','>',self.name+'.log']
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE).wait()
-        self.process_output()
+        for label in self.levels:
+            os.remove(os.path.join(self.path,label,"xyz",self.name+".xyz"))
+            os.remove(os.path.join(self.path,label,self.name+".txt"))
 
-def turbomoletospecies(name,inchi,smiles,job):
+    def run(self,timeout=None,sink=None,pool=None,cores=None):
+        """
+        Run the Turbomole job
+        timeout is the number of seconds after which each calculation is killed
+        and a subprocess.TimeoutExpired is raised
+        if an event sink (see pysolvation.instrumentation) is given the wall time of
+        each stage, the resource usage of the calculations and the file sizes are emitted to it
+        if a CorePool (see pysolvation.runner) is given each calculation waits for cores
+        cores (1 by default) from it, if cores is given Turbomole is told to use that many
+        through PARNODES and OMP_NUM_THREADS (source Turbomole with PARA_ARCH=SMP for cores > 1)
+        """
+        run_sync(self.run_async(timeout=timeout,sink=sink,pool=pool,cores=cores))
+
+    async def run_async(self,timeout=None,sink=None,pool=None,cores=None):
+        """
+        Coroutine version of run so many jobs can be awaited from one event loop
+        the cosmo and energy calculations run concurrently and their output is
+        written to the .log file in their subdirectory
+        """
+        env = None if cores is None else {"PARNODES":str(cores),"OMP_NUM_THREADS":str(cores)}
+        with job_recorder(sink,"TurbomoleJob",self.name) as recorder:
+            with stage(recorder,"generate_input"):
+                self.generate_input_file()
+
+            async def calculate(label,level):
+                #Note you need to have sourced Turbomole for this to work
+                #ex: source /home/gridsan/groups/RMG/Software/TmoleX19/TURBOMOLE/Config_turbo_env
+                workdir = os.path.join(self.path,label)
+                log = os.path.join(workdir,self.name+".log")
+                cmd = ['calculate', '-l', self.name+'.txt','-m',level,'-f','xyz','-din','xyz']
+                allotment = pool.allot(cores or 1) if pool is not None else contextlib.nullcontext()
+                async with allotment:
+                    with stage(recorder,label+"_subprocess"):
+                        await run_process_async(cmd,cwd=workdir,timeout=timeout,stdout_path=log,
+                                                stderr_path=log,env=env,recorder=recorder)
+                if recorder is not None:
+                    recorder.record_file(label+"_log",log)
+
+            await gather_cancelling(*[calculate(label,level) for label,level in self.levels.items()])
+            with stage(recorder,"process_output"):
+                self.process_output(cleanup=False)
+            if recorder is not None:
+                recorder.record_file("xyz",os.path.join(self.path,"cosmo","xyz",self.name+".xyz"))
+                recorder.record_file("cosmo",self.output_cosmo_file)
+                recorder.record_file("energy",self.output_energy_file)
+            with stage(recorder,"cleanup"):
+                self.cleanup()
+
+def turbomoletospecies(name,inchi,smiles,job,file_store=None):
+    """
+    Makes a COSMOSpecies from the output of a completed TurbomoleJob
+    or a list of completed TurbomoleJob objects, one per conformer, whose
+    output files are moved into the directory they share and renumbered
+    <name>_c0, <name>_c1... in the order of the list
+    if a COSMOFileStore is given the .cosmo files are registered in it
+    """
     if not isinstance(job,list):
         path = os.path.split(job.output_cosmo_file)[0]
-        return COSMOSpecies(name,inchi,smiles,1,path)
+        spc = COSMOSpecies(name,inchi,smiles,1,path)
+    elif len(job) == 0:
+        raise ValueError("No conformers given for {}".format(name))
     else:
-        raise ValueError("Cannot handle more than 1 conformer yet")
+        path = os.path.commonpath([os.path.dirname(j.output_cosmo_file) for j in job])
+        moves = []
+        for k,j in enumerate(job):
+            output = os.path.join(path,name+"_c"+str(k))
+            for attr,ext in [("output_cosmo_file",".cosmo"),("output_energy_file",".energy")]:
+                if getattr(j,attr) != output+ext:
+                    #move out of the way first so renumbering can't overwrite another conformer
+                    os.replace(getattr(j,attr),getattr(j,attr)+".moving")
+                    moves.append((j,attr,output+ext))
+        for j,attr,dest in moves:
+            os.replace(getattr(j,attr)+".moving",dest)
+            setattr(j,attr,dest)
+        spc = COSMOSpecies(name,inchi,smiles,len(job),path)
+    if file_store is not None:
+        spc.register(file_store)
+    return spc
@@ -0,0 +1,68 @@
+import os
+import sys
+import stat
+import pytest
+from pysolvation.cosmo.cosmotherm import COSMOJob
+from pysolvation.cosmo.database import COSMOSpecies
+from pysolvation.cosmo.scheduler import COSMOJobScheduler
+
+fake_cosmotherm = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "benchmarks","fake_cosmotherm.py")
+
+@pytest.fixture
+def cosmotherm(tmp_path,monkeypatch):
+    monkeypatch.setenv("COSMOTHERM",fake_cosmotherm)
+    monkeypatch.setenv("COSMOTHERMPATH",str(tmp_path))
+    monkeypatch.setenv("FAKE_COSMOTHERM_LATENCY","0")
+    return tmp_path
+
+def make_jobs(tmp_path,n):
+    water = COSMOSpecies("water","InChI=1/H2O/h1H2","O",1,str(tmp_path))
+    jobs = dict()
+    for i in range(n):
+        solute = COSMOSpecies("spc{}".format(i),"inchi{}".format(i),"C",1,str(tmp_path))
+        jobs[solute] = (solute.name,COSMOJob.infinite_dilution({water:1.0},[solute],path=solute.name,
+                                                               Tlist=[297.15,298.15,299.15]))
+    return jobs
+
+def test_success(cosmotherm):
+    jobs = make_jobs(cosmotherm,4)
+    scheduler = COSMOJobScheduler(max_workers=2,scratch_dir=str(cosmotherm/"scratch"))
+    completed = []
+    results = scheduler.run(jobs,on_complete=lambda key,job: completed.append(key))
+    assert set(results) == set(jobs)
+    assert set(completed) == set(jobs)
+    assert scheduler.failures == []
+    for solute,job in results.items():
+        assert len(job.solute_results[solute]["Gsolv"]) == 3
+    assert os.listdir(str(cosmotherm/"scratch")) == []
+
+def test_timeout(cosmotherm,monkeypatch):
+    monkeypatch.setenv("FAKE_COSMOTHERM_LATENCY","5")
+    jobs = make_jobs(cosmotherm,1)
+    scheduler = COSMOJobScheduler(timeout=0.2,max_retries=1,scratch_dir=str(cosmotherm/"scratch"))
+    assert scheduler.run(jobs) == dict()
+    [failure] = scheduler.failures
+    assert failure.error_type == "TimeoutExpired"
+    assert failure.attempts == 2
+    assert os.path.exists(failure.path+".log")
+
+def test_retry(cosmotherm,monkeypatch):
+    wrapper = cosmotherm/"flaky_cosmotherm.py"
+    marker = cosmotherm/"failed_once"
+    wrapper.write_text("#!{}\nimport os, sys\n"
+                       "if not os.path.exists({!r}):\n"
+                       "    open({!r},'w').close()\n"
+                       "    sys.exit(1)\n"
+                       "os.execv({!r},[{!r}]+sys.argv[1:])\n".format(sys.executable,str(marker),str(marker),
+                                                                      fake_cosmotherm,fake_cosmotherm))
+    wrapper.chmod(wrapper.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("COSMOTHERM",str(wrapper))
+    jobs = make_jobs(cosmotherm,1)
+    scheduler = COSMOJobScheduler(max_retries=0)
+    assert scheduler.run(jobs) == dict()
+    assert len(scheduler.failures) == 1
+    os.remove(str(marker))
+    scheduler = COSMOJobScheduler(max_retries=1)
+    assert set(scheduler.run(jobs)) == set(jobs)
+    assert scheduler.failures == []